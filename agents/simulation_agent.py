@@ -1,6 +1,9 @@
 from core.logger import setup_logger
 from core.schemas import ToolResult
 from core.local_tools import LOCAL_TOOL_REGISTRY
+from core.tracing import span
+from core.streaming import is_partial
+from core.request_merging import plan, split
 
 TASK_TO_TOOL = {
     "constellation": "simulate_constellation",
@@ -10,33 +13,157 @@ TASK_TO_TOOL = {
     "multi_radio_map": "simulate_multi_radio_map",
 }
 
+# Tools that accumulate per-SNR counts in a BerStore (store=...)
+STORE_TOOLS = ("simulate_ber", "simulate_ber_mimo")
+
 class SimulationAgent:
-    def __init__(self, mcp_client=None, use_mcp=False):
+    def __init__(self, mcp_client=None, use_mcp=False, cache=None, render=None, ber_store=None):
         self.mcp = mcp_client
         self.use_mcp = use_mcp
+        self.cache = cache
+        self.render = render          # default plot render mode for tools, unless params set one
+        self.ber_store = ber_store    # BerStore path for STORE_TOOLS, unless params set one
         self.logger = setup_logger("SimulationAgent")
 
+    def _params(self, task_spec):
+        params = task_spec.parameters or {}
+        if self.render is not None and "render" not in params:
+            params = dict(params, render=self.render)
+        if (self.ber_store is not None and "store" not in params
+                and TASK_TO_TOOL.get(task_spec.task_type) in STORE_TOOLS):
+            params = dict(params, store=self.ber_store)
+        return params
+
     def run(self, task_spec):
         tool_name = TASK_TO_TOOL.get(task_spec.task_type)
         task_spec.tool_name = tool_name
-        params = task_spec.parameters or {}
+        return task_spec, self._call(tool_name, self._params(task_spec))
 
+    def _call(self, tool_name, params, use_cache=True, lookup=True):
+        """
+        Cache -> MCP -> local tool. Returns: ToolResult
+        The local fallback runs on transport errors, 5xx or an open breaker; a
+        4xx from the server (the tool failed there) is returned as is.
+        lookup=False skips the cache lookup (the caller already missed) but still stores the result.
+        """
         self.logger.info(f"Calling tool: {tool_name} with params: {params}")
 
-        # ---- 1) Try MCP only if enabled ----
-        if self.use_mcp and self.mcp is not None:
-            result = self.mcp.call_tool(tool_name, params)
+        # ---- 0) Result cache (no tool call, no TF import) ----
+        if self.cache is not None and use_cache and lookup:
+            with span("cache_lookup"):
+                cached = self.cache.get(tool_name, params)
+            if cached is not None:
+                self.logger.info("Result cache hit.")
+                return ToolResult(ok=True, payload=cached)
+
+        # ---- 1) Try MCP only if enabled (and its circuit breaker is closed) ----
+        if self.use_mcp and self.mcp is not None and not self.mcp.is_available():
+            self.logger.warning("MCP server marked unhealthy, using local tools.")
+        elif self.use_mcp and self.mcp is not None:
+            with span("mcp_call"):
+                result = self.mcp.call_tool(tool_name, params)
             if result.ok:
                 self.logger.info("MCP tool call success.")
-                return task_spec, result
+                if use_cache:
+                    self._cache_put(tool_name, params, result.payload)
+                return result
+            if result.status is not None and 400 <= result.status < 500:
+                # The tool itself failed on the server: rerunning it locally would fail the same way
+                self.logger.error(f"MCP tool call failed: {result.error}")
+                return result
             self.logger.warning(f"MCP failed, falling back to local tools: {result.error}")
 
         # ---- 2) Local tool fallback ----
         try:
-            tool_fn = LOCAL_TOOL_REGISTRY[tool_name]
-            payload = tool_fn(**params)
+            with span("tool_import"):
+                tool_fn = LOCAL_TOOL_REGISTRY[tool_name]
+            with span(tool_name):
+                payload = tool_fn(**params)
             self.logger.info("Local tool call success.")
-            return task_spec, ToolResult(ok=True, payload=payload)
+            if use_cache:
+                self._cache_put(tool_name, params, payload)
+            return ToolResult(ok=True, payload=payload)
         except Exception as e:
             self.logger.error(f"Local tool call failed: {e}")
-            return task_spec, ToolResult(ok=False, payload={}, error=str(e))
+            return ToolResult(ok=False, payload={}, error=str(e))
+
+    def run_many(self, task_specs):
+        """
+        Batched run(): cache hits are served first, the remaining tasks are
+        grouped by tool and compatible ones merged into one call
+        (core.request_merging), whose result is split back per task.
+        Returns: [(task_spec, ToolResult)] in input order
+        """
+        results = [None] * len(task_specs)
+        pending = []                                    # (index, tool_name, params)
+        for i, task_spec in enumerate(task_specs):
+            task_spec.tool_name = TASK_TO_TOOL.get(task_spec.task_type)
+            params = self._params(task_spec)
+            cached = None
+            if self.cache is not None:
+                with span("cache_lookup"):
+                    cached = self.cache.get(task_spec.tool_name, params)
+            if cached is not None:
+                results[i] = (task_spec, ToolResult(ok=True, payload=cached))
+            else:
+                pending.append((i, task_spec.tool_name, params))
+
+        items = [(tool_name, params) for _, tool_name, params in pending]
+        for call in plan(items):
+            if call.merged:
+                self.logger.info(f"Merged {len(call.members)} {call.source_tool} tasks into one {call.tool_name} call")
+            result = self._call(call.tool_name, call.params, use_cache=False)
+            if result.ok:
+                with span("split"):
+                    payloads = split(call, result.payload, items)
+
+            for j, m in enumerate(call.members):
+                i, tool_name, params = pending[m]
+                if result.ok:
+                    results[i] = (task_specs[i], ToolResult(ok=True, payload=payloads[j]))
+                    self._cache_put(tool_name, params, payloads[j])
+                else:
+                    results[i] = (task_specs[i], ToolResult(ok=False, payload={}, error=result.error))
+        return results
+
+    def _cache_put(self, tool_name, params, payload):
+        if self.cache is not None:
+            self.cache.put(tool_name, params, payload)
+
+    def run_stream(self, task_spec):
+        """
+        Like run(), but yields (task_spec, ToolResult) after every partial
+        result of the local streaming tool; the last one yielded is final.
+        Cache hits and MCP calls yield once.
+        """
+        tool_name = TASK_TO_TOOL.get(task_spec.task_type)
+        task_spec.tool_name = tool_name
+        params = self._params(task_spec)
+
+        if self.cache is not None:
+            with span("cache_lookup"):
+                cached = self.cache.get(tool_name, params)
+            if cached is not None:
+                self.logger.info("Result cache hit.")
+                yield task_spec, ToolResult(ok=True, payload=cached)
+                return
+        if self.use_mcp and self.mcp is not None:
+            yield task_spec, self._call(tool_name, params, lookup=False)
+            return
+
+        self.logger.info(f"Streaming tool: {tool_name} with params: {params}")
+        try:
+            with span("tool_import"):
+                iter_fn = LOCAL_TOOL_REGISTRY.stream(tool_name)
+            payload = None
+            for payload in iter_fn(**dict(params, preview=True)):
+                if is_partial(payload):
+                    yield task_spec, ToolResult(ok=True, payload=payload)
+        except Exception as e:
+            self.logger.error(f"Local tool call failed: {e}")
+            yield task_spec, ToolResult(ok=False, payload={}, error=str(e))
+            return
+
+        self.logger.info("Local tool call success.")
+        self._cache_put(tool_name, params, payload)
+        yield task_spec, ToolResult(ok=True, payload=payload)
@@ -13,8 +13,12 @@ class SummaryAgent:
         summary = [
             f"Task type: {task_spec.task_type}",
             f"Tool used: {task_spec.tool_name}",
-            "Result generated successfully.",
         ]
+        if payload.get("partial"):
+            p = payload["progress"]
+            summary.append(f"Running... partial result {p['done']}/{p['total']} ({p['unit']}s)")
+        else:
+            summary.append("Result generated successfully.")
 
         if "plots" in payload:
             summary.append(f"Plots: {payload['plots']}")
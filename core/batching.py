@@ -0,0 +1,121 @@
+"""
+Memory-aware batch sizing for the Monte Carlo tools (batch_size="auto").
+
+Per-symbol working-set estimates (bytes) for each link, calibrated with
+tracemalloc against the NumPy backend; the Sionna estimates add the
+demapper's [B, k, M/2] gather tensors. The chosen batch is the largest
+that fits the memory budget, capped at MAX_BATCH (beyond that, per-batch
+overhead is already amortized), then evened out over the symbols a point needs.
+
+BackoffCounter wraps a count_batch and halves the batch (rebuilding the
+counter) on MemoryError / TF ResourceExhaustedError instead of failing.
+"""
+import logging
+import os
+
+MIN_BATCH = 64
+MAX_BATCH = 1 << 16
+SAFETY = 1.5                      # headroom for allocator / framework overhead
+DEFAULT_BUDGET_CAP = 1 << 30      # 1 GiB
+DEFAULT_BUDGET_FRACTION = 0.25    # of currently available physical memory
+
+logger = logging.getLogger("Batching")
+
+
+def available_memory_bytes():
+    """Available physical memory, or None where sysconf can't tell."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def memory_budget_bytes(memory_budget_mb=None, workers=1):
+    """Explicit budget (MiB), else a share of available memory; split across workers."""
+    if memory_budget_mb is not None:
+        budget = int(memory_budget_mb * 2**20)
+    else:
+        avail = available_memory_bytes()
+        budget = min(DEFAULT_BUDGET_CAP, int(avail * DEFAULT_BUDGET_FRACTION)) if avail else 256 * 2**20
+    return budget // max(1, workers or 1)
+
+
+def ber_bytes_per_symbol(k, fading, demapping="app", backend="numpy"):
+    """SISO link + LLR demapper working set per symbol."""
+    M = 2 ** k
+    if backend == "numpy":
+        # [N, M] complex distances + float metric / exp temporaries (+ h * const when fading)
+        per = M * (24 + 16 * fading) + 96
+    else:
+        # float32 [N, M] distances/exponents + [N, k, M/2] gathers per bit class
+        per = M * (4 * k + 24 + 8 * fading) + 64 + 8 * k
+    return int(per * SAFETY)
+
+
+def mimo_bytes_per_symbol(k, nt, nr, backend="numpy"):
+    """Repetition-TX MIMO link + MRC + slicer working set per symbol."""
+    if backend == "numpy":
+        # g / noise / y / conj(g) y buffers (complex128, [B, nr]) + per-call temporaries
+        per = 80 * nr + 64
+    else:
+        # Stateless per-call draws of h [B, nr, nt]: float32 re/im normals, scaled
+        # temporaries and the complex64 result; then noise / g / y [B, nr] + their NumPy copies
+        per = 32 * nr * nt + 64 * nr + 16 * k + 64
+    return int(per * SAFETY)
+
+
+def auto_batch_size(bytes_per_symbol, budget_bytes, max_symbols=None):
+    """
+    Largest batch (multiple of MIN_BATCH) within budget and MAX_BATCH.
+    With max_symbols (symbols a point needs), the batch is evened out so the
+    last batch doesn't overshoot the target by up to a whole batch.
+    """
+    b = min(budget_bytes // max(1, bytes_per_symbol), MAX_BATCH)
+    b = max(MIN_BATCH, b // MIN_BATCH * MIN_BATCH)
+    if max_symbols:
+        n_batches = -(-int(max_symbols) // b)
+        b = -(-int(max_symbols) // n_batches)
+        b = -(-b // MIN_BATCH) * MIN_BATCH
+    return int(b)
+
+
+def is_oom(exc) -> bool:
+    # Matched by name so TensorFlow doesn't have to be importable here
+    return isinstance(exc, MemoryError) or type(exc).__name__ == "ResourceExhaustedError"
+
+
+class BackoffCounter:
+    """
+    count_batch(no, *args) -> (n_err, n_bits) that survives allocation
+    failures: on OOM the batch is halved, the counter rebuilt via
+    factory(batch_size) and the batch retried, down to MIN_BATCH.
+    """
+
+    def __init__(self, factory, batch_size, min_batch=MIN_BATCH):
+        self.factory = factory
+        self.batch_size = int(batch_size)
+        self.min_batch = min_batch
+        self.backoffs = 0
+        self.count_batch, self.snr_to_no = self._build()
+
+    def __call__(self, no, *args):
+        while True:
+            try:
+                return self.count_batch(no, *args)
+            except Exception as e:
+                if not is_oom(e) or self.batch_size <= self.min_batch:
+                    raise
+                self.batch_size = max(self.min_batch, self.batch_size // 2)
+                self.backoffs += 1
+                logger.warning(f"Out of memory, retrying with batch_size={self.batch_size}")
+                self.count_batch, self.snr_to_no = self._build()
+
+    def _build(self):
+        while True:
+            try:
+                return self.factory(self.batch_size)
+            except Exception as e:
+                if not is_oom(e) or self.batch_size <= self.min_batch:
+                    raise
+                self.batch_size = max(self.min_batch, self.batch_size // 2)
+                self.backoffs += 1
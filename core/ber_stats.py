@@ -0,0 +1,111 @@
+"""
+Stopping rules and confidence intervals for Monte Carlo BER sweeps.
+
+Plain Monte Carlo points are (n_err, n_tot) counts with a Wilson interval.
+Importance-sampling points are (sum_w, sum_w2, n_err, n_tot): the weighted
+bit errors w * e per symbol, their squares, the raw error count and the
+bits; their interval is the normal one from the sample variance.
+"""
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Optional
+
+
+def wilson_interval(n_err, n_tot, confidence=0.95):
+    """
+    Wilson score interval for a binomial proportion.
+    Stays meaningful at n_err = 0 (upper bound ~ z^2 / n_tot instead of BER = 0).
+    Returns: (lo, hi)
+    """
+    if n_tot <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = n_err / n_tot
+    z2n = z * z / n_tot
+    centre = (p + z2n / 2) / (1 + z2n)
+    half = z * ((p * (1 - p) / n_tot + z2n / (4 * n_tot)) ** 0.5) / (1 + z2n)
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def is_interval(sum_w, sum_w2, n_tot, k, confidence=0.95):
+    """
+    Normal interval of an importance-sampling BER estimate sum_w / n_tot,
+    from the per-symbol variance of w * e / k (k bits per symbol).
+    Returns: (lo, hi)
+    """
+    n_sym = n_tot / k
+    if n_sym <= 1:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    mean = sum_w / n_tot
+    var = max(sum_w2 / (k * k * n_sym) - mean * mean, 0.0) / (n_sym - 1)
+    half = z * var ** 0.5
+    return max(0.0, mean - half), min(1.0, mean + half)
+
+
+@dataclass
+class StoppingRule:
+    """
+    Per-SNR-point stopping rule.
+
+    Without target_errors / ci_rel_width the point runs the full n_bits
+    (the historic behaviour). With either rule set, a point stops as soon as
+      - n_err >= target_errors, or
+      - (ci_hi - ci_lo) / ber <= ci_rel_width,
+    and at the latest after max_bits (defaults to n_bits).
+    """
+    n_bits: int = 200000
+    target_errors: Optional[int] = None
+    ci_rel_width: Optional[float] = None
+    max_bits: Optional[int] = None
+    confidence: float = 0.95
+
+    @property
+    def cap(self):
+        return int(self.max_bits) if self.max_bits else int(self.n_bits)
+
+    def done(self, n_err, n_tot):
+        if n_tot >= self.cap:
+            return True
+        if self.target_errors is not None and n_err >= self.target_errors:
+            return True
+        if self.ci_rel_width is not None and n_err > 0:
+            lo, hi = wilson_interval(n_err, n_tot, self.confidence)
+            if (hi - lo) / (n_err / n_tot) <= self.ci_rel_width:
+                return True
+        return False
+
+    def done_is(self, sum_w, sum_w2, n_err, n_tot, k):
+        """done() for an importance-sampling point (target_errors counts raw error bits)."""
+        if n_tot >= self.cap:
+            return True
+        if self.target_errors is not None and n_err >= self.target_errors:
+            return True
+        if self.ci_rel_width is not None and sum_w > 0:
+            lo, hi = is_interval(sum_w, sum_w2, n_tot, k, self.confidence)
+            if (hi - lo) / (sum_w / n_tot) <= self.ci_rel_width:
+                return True
+        return False
+
+
+def point_kpis(n_err, n_tot, confidence=0.95):
+    """BER, counts and CI for one SNR point."""
+    n_err, n_tot = int(n_err), int(n_tot)
+    lo, hi = wilson_interval(n_err, n_tot, confidence)
+    return {
+        "ber": n_err / n_tot if n_tot else 0.0,
+        "errors": int(n_err),
+        "bits": int(n_tot),
+        "ci": [lo, hi],
+    }
+
+
+def is_point_kpis(sum_w, sum_w2, n_err, n_tot, k, confidence=0.95):
+    """point_kpis() for an importance-sampling point; "errors" are the raw (unweighted) error bits."""
+    lo, hi = is_interval(sum_w, sum_w2, n_tot, k, confidence)
+    return {
+        "ber": float(sum_w) / n_tot if n_tot else 0.0,
+        "errors": int(n_err),
+        "bits": int(n_tot),
+        "ci": [lo, hi],
+    }
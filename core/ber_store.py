@@ -0,0 +1,70 @@
+"""
+Persistent per-SNR-point BER accumulator store.
+
+Keeps (n_err, n_tot) counters per
+  (modulation, channel, antenna config, demapper, SNR)
+so BER tools only simulate missing points or the extra bits needed to reach
+a new n_bits target, then merge the counts.
+
+Stored as a single JSON file: {point_key: [n_err, n_tot]}.
+"""
+import json
+import os
+import threading
+
+_OPEN_STORES = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def point_key(modulation, channel, nt=1, nr=1, demapper="app", snr_db=0.0):
+    return f"{modulation.lower()}|{channel.lower()}|{nt}x{nr}|{demapper}|{float(snr_db):g}"
+
+
+class BerStore:
+    def __init__(self, path="outputs/ber_store.json"):
+        self.path = path
+        self._counts = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._counts = {k: tuple(v) for k, v in json.load(f).items()}
+
+    def get(self, key):
+        """Returns (n_err, n_tot) accumulated so far for this point."""
+        with self._lock:
+            return self._counts.get(key, (0, 0))
+
+    def add(self, key, n_err, n_tot):
+        """Merges new counts into the point."""
+        with self._lock:
+            e, t = self._counts.get(key, (0, 0))
+            self._counts[key] = (e + int(n_err), t + int(n_tot))
+
+    def keys(self):
+        with self._lock:
+            return list(self._counts)
+
+    def flush(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {k: list(v) for k, v in self._counts.items()}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def open_store(store):
+    """
+    store: None | BerStore | path string.
+    Paths are opened once per process and shared between calls.
+    """
+    if store is None or isinstance(store, BerStore):
+        return store
+    path = os.path.abspath(store)
+    with _OPEN_LOCK:
+        if path not in _OPEN_STORES:
+            _OPEN_STORES[path] = BerStore(path)
+        return _OPEN_STORES[path]
@@ -6,21 +6,141 @@ to the actual Sionna tool implementations inside /tools.
 
 IMPORTANT:
 - Do NOT keep dummy/stub tool functions here.
-- Only keep imports + registry.
+- Only keep module paths + registry.
+
+Tool modules (and matplotlib / TensorFlow behind them) are imported on first
+use, so importing main.py only pays for the parser agents. Call
+LOCAL_TOOL_REGISTRY.warm_up() to pay the cost up front instead.
 """
+import importlib
+import sys
+import threading
+import time
+from collections.abc import Mapping
+
+# tool name -> module path (function has the same name as the tool)
+TOOL_MODULES = {
+    "simulate_constellation": "tools.simulate_constellation",
+    "simulate_ber": "tools.simulate_ber",
+    "simulate_ber_mimo": "tools.simulate_ber_mimo",
+    "simulate_radio_map": "tools.simulate_radio_map",
+    "simulate_radio_maps": "tools.simulate_radio_map",      # stacked single-TX maps (chat_many)
+    "simulate_multi_radio_map": "tools.simulate_multi_radio_map",
+}
+
+
+def timed_import(module_path):
+    """
+    Imports a module and reports what it cost in this process.
+    Returns: (module, {"module", "seconds", "new_modules", "pulled_in"})
+    """
+    before = set(sys.modules)
+    t0 = time.perf_counter()
+    module = importlib.import_module(module_path)
+    seconds = time.perf_counter() - t0
+    new = set(sys.modules) - before
+    pulled_in = sorted({m.split(".")[0] for m in new} - {module_path.split(".")[0]})
+    return module, {
+        "module": module_path,
+        "seconds": seconds,
+        "new_modules": len(new),
+        "pulled_in": pulled_in,
+    }
+
+
+class LazyToolRegistry(Mapping):
+    """Dict-like tool registry that imports a tool module on first lookup."""
+
+    def __init__(self, modules):
+        self._modules = dict(modules)
+        self._loaded = {}
+        self._report = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, tool_name):
+        fn = self._loaded.get(tool_name)
+        if fn is not None:
+            return fn
+        if tool_name not in self._modules:
+            raise KeyError(tool_name)
+        with self._lock:
+            if tool_name not in self._loaded:
+                module, info = timed_import(self._modules[tool_name])
+                self._loaded[tool_name] = getattr(module, tool_name)
+                self._report[tool_name] = info
+            return self._loaded[tool_name]
+
+    def __iter__(self):
+        return iter(self._modules)
+
+    def __len__(self):
+        return len(self._modules)
 
-from tools.simulate_constellation import simulate_constellation
-from tools.simulate_ber import simulate_ber
-from tools.simulate_ber_mimo import simulate_ber_mimo
-from tools.simulate_radio_map import simulate_radio_map
-from tools.simulate_multi_radio_map import simulate_multi_radio_map
+    def stream(self, tool_name):
+        """
+        Streaming variant `iter_<tool>` of a tool (see core.streaming); tools
+        without one are wrapped to yield their single final payload.
+        """
+        fn = self[tool_name]
+        module = sys.modules[self._modules[tool_name]]
+        iter_fn = getattr(module, f"iter_{tool_name}", None)
+        if iter_fn is None:
+            from core.streaming import single_shot
+            iter_fn = single_shot(fn)
+        return iter_fn
+
+    def is_loaded(self, tool_name):
+        return tool_name in self._loaded
+
+    def warm_up(self, tool_names=None):
+        """Imports the given tools (default: all) now. Returns import_report()."""
+        for name in tool_names or list(self._modules):
+            self[name]
+        return self.import_report()
+
+    def import_report(self):
+        """Per-tool import cost, in load order, for tools loaded so far."""
+        return [dict(info, tool=name) for name, info in self._report.items()]
+
+
+def format_import_report(rows):
+    lines = [f"{'module':40s} {'ms':>9s} {'new mods':>9s}  pulled in"]
+    for r in rows:
+        lines.append(
+            f"{r['module']:40s} {r['seconds'] * 1e3:9.1f} {r['new_modules']:9d}  "
+            f"{', '.join(r['pulled_in']) or '-'}"
+        )
+    return "\n".join(lines)
 
 
 # Registry used by SimulationAgent
-LOCAL_TOOL_REGISTRY = {
-    "simulate_constellation": simulate_constellation,
-    "simulate_ber": simulate_ber,
-    "simulate_ber_mimo": simulate_ber_mimo,
-    "simulate_radio_map": simulate_radio_map,
-    "simulate_multi_radio_map": simulate_multi_radio_map,
-}
+LOCAL_TOOL_REGISTRY = LazyToolRegistry(TOOL_MODULES)
+
+
+# Modules main.TelecomMultiAgentAssistant needs before the first prompt
+STARTUP_MODULES = [
+    "core.schemas",
+    "core.task_decomposer",
+    "core.mcp_client",
+    "core.session_store",
+    "core.result_cache",
+    "agents.interpreter_agent",
+    "agents.parameter_extractor_agent",
+    "agents.simulation_agent",
+    "agents.summary_agent",
+    "main",
+]
+
+
+if __name__ == "__main__":
+    # Run in a fresh process for a meaningful breakdown:
+    #   python -m core.local_tools
+    rows = [timed_import(m)[1] for m in STARTUP_MODULES]
+    print("--- Assistant cold start ---")
+    print(format_import_report(rows))
+    print(f"total: {sum(r['seconds'] for r in rows) * 1e3:.1f} ms\n")
+
+    print("--- Tool warm-up ---")
+    tool_rows = LOCAL_TOOL_REGISTRY.warm_up()
+    print(format_import_report(tool_rows))
+    print(f"total: {sum(r['seconds'] for r in tool_rows) * 1e3:.1f} ms")
@@ -1,6 +1,68 @@
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from core.schemas import ToolResult
 
+# Read timeouts (s) per tool; analytical maps answer fast, Monte Carlo sweeps don't
+DEFAULT_TIMEOUTS = {
+    "simulate_constellation": 30.0,
+    "simulate_radio_map": 30.0,
+    "simulate_multi_radio_map": 60.0,
+    "simulate_ber": 120.0,
+    "simulate_ber_mimo": 300.0,
+}
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; `failure_threshold` consecutive failures open it
+    open      -> calls are refused for `reset_timeout` seconds
+    half_open -> one probe call; success closes, failure re-opens
+    """
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return self.state == "closed"
+
+    def peek(self) -> bool:
+        """Like allow(), but without claiming the half-open probe."""
+        with self._lock:
+            if self.state == "open":
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return self.state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+def _server_error(r):
+    """The error message of an MCP server error payload (else the HTTP status line)."""
+    try:
+        return r.json()["error"]
+    except Exception:
+        return f"HTTP {r.status_code}: {r.text[:200]}"
+
+
 class MCPClient:
     """
     Thin HTTP client to your MCP server.
@@ -10,15 +72,109 @@ class MCPClient:
       /simulate_ber_mimo
       /simulate_radio_map
       /simulate_multi_radio_map
+
+    Uses one pooled keep-alive Session, per-tool read timeouts, bounded
+    retries with exponential backoff on connection errors / 5xx, and a
+    circuit breaker so callers fall back to local tools immediately while
+    the server is known to be down. A read timeout is not retried: the
+    server may still be running the (non-idempotent) simulation. A 4xx
+    (the tool itself failed) is final: its error is returned with the
+    status so callers don't rerun the tool locally.
     """
-    def __init__(self, base_url="http://localhost:8080"):
+    def __init__(
+        self,
+        base_url="http://localhost:8080",
+        timeouts=None,                 # tool name -> read timeout (s)
+        connect_timeout=2.0,
+        max_retries=2,
+        backoff=0.25,                  # s, doubled per retry
+        pool_size=16,
+        breaker=None,
+    ):
         self.base_url = base_url.rstrip("/")
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """False while the circuit breaker is open."""
+        return self.breaker.peek()
 
     def call_tool(self, tool_name: str, params: dict) -> ToolResult:
+        if not self.breaker.allow():
+            return ToolResult(ok=False, payload={}, error="MCP circuit open (server unhealthy)")
+
+        import requests   # lazy: keeps assistant cold start free of HTTP stack
+
         url = f"{self.base_url}/{tool_name}"
-        try:
-            r = requests.post(url, json=params, timeout=120)
-            r.raise_for_status()
-            return ToolResult(ok=True, payload=r.json())
-        except Exception as e:
-            return ToolResult(ok=False, payload={}, error=str(e))
+        timeout = (self.connect_timeout, self.timeouts.get(tool_name, 120.0))
+        error = None
+        status = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            try:
+                r = self._get_session().post(url, json=params, timeout=timeout)
+                status = r.status_code
+                if status >= 500:
+                    error = f"HTTP {status} from {url}"
+                    continue
+                if status >= 400:
+                    # The server answered: the tool / request failed, retrying won't help
+                    self.breaker.record_success()
+                    return ToolResult(ok=False, payload={}, error=_server_error(r), status=status)
+                r.raise_for_status()
+                self.breaker.record_success()
+                return ToolResult(ok=True, payload=r.json(), status=status)
+            except requests.ReadTimeout as e:
+                # The request got through; re-posting would start the run again
+                self.breaker.record_failure()
+                return ToolResult(ok=False, payload={}, error=str(e))
+            except requests.ConnectionError as e:
+                # Includes ConnectTimeout: nothing reached the server yet
+                error = str(e)
+            except Exception as e:
+                # Bad JSON: the server answered, retrying won't help
+                self.breaker.record_success()
+                return ToolResult(ok=False, payload={}, error=str(e), status=status)
+
+        self.breaker.record_failure()
+        return ToolResult(ok=False, payload={}, error=error, status=status)
+
+    def call_tools(self, calls, max_workers=None):
+        """
+        Dispatches several tool calls concurrently over the pooled session.
+        calls: [(tool_name, params), ...]
+        Returns: [ToolResult] in the same order
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+        workers = max_workers or min(len(calls), self.pool_size)
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(lambda c: self.call_tool(*c), calls))
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                self._session = s
+            return self._session
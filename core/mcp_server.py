@@ -0,0 +1,305 @@
+"""
+Local MCP tool server: the HTTP side MCPClient talks to.
+
+  POST /<tool_name>   JSON params -> JSON payload (NumPy arrays as lists)
+  GET  /health        {"ok": true, "tools": [...]}
+  GET  /metrics       per-tool request / coalescing / concurrency counters
+
+Tools from LOCAL_TOOL_REGISTRY run on a process pool, so Monte Carlo sweeps
+don't hold the GIL of the request threads; the worker also serializes the
+payload to JSON, so the parent only moves bytes. Each tool has a
+concurrency limit (a semaphore in front of the pool), so a burst of MIMO
+sweeps can't occupy every worker.
+
+Identical in-flight requests (same tool + canonical params, keyed like the
+result cache) are coalesced: the first one computes, later ones wait on its
+future and all of them get the same response bytes.
+
+A tool that raises answers 422 (the worker turns the exception into an
+error payload). A pool that broke (a worker was killed, e.g. OOM) answers
+503 and is replaced, so the client retries / trips its breaker and the
+server recovers instead of failing every later request.
+
+Binds to loopback only:
+    python -m core.mcp_server --port 8080 --workers 4
+"""
+import argparse
+import ipaddress
+import json
+import logging
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.local_tools import TOOL_MODULES
+from core.result_cache import make_key
+
+# Tool calls that may run at once, per tool (the pool bounds the total)
+DEFAULT_LIMITS = {
+    "simulate_constellation": 4,
+    "simulate_radio_map": 4,
+    "simulate_radio_maps": 2,
+    "simulate_multi_radio_map": 2,
+    "simulate_ber": 2,
+    "simulate_ber_mimo": 1,
+}
+
+logger = logging.getLogger("MCPServer")
+
+
+def to_jsonable(value):
+    """
+    Payload -> JSON-safe structure: arrays and NumPy scalars become lists /
+    Python numbers, complex values {"real": ..., "imag": ...}, tuples lists.
+    (NumPy is detected via .tolist(), as in core.result_cache.canonicalize.)
+    """
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if hasattr(value, "tolist") and not isinstance(value, (str, bytes)):
+        if getattr(getattr(value, "dtype", None), "kind", None) == "c":
+            return {"real": value.real.tolist(), "imag": value.imag.tolist()}
+        return value.tolist()
+    if isinstance(value, complex):
+        return {"real": value.real, "imag": value.imag}
+    return value
+
+
+def _error_body(message):
+    return json.dumps({"plots": [], "kpis": {}, "error": message}).encode("utf-8")
+
+
+def _run_tool(tool_name, params):
+    """Pool worker: runs the tool. Returns: (HTTP status, JSON bytes); tool errors are 422."""
+    from core.local_tools import LOCAL_TOOL_REGISTRY
+    try:
+        payload = LOCAL_TOOL_REGISTRY[tool_name](**params)
+        return 200, json.dumps(to_jsonable(payload)).encode("utf-8")
+    except Exception as e:
+        return 422, _error_body(f"{type(e).__name__}: {e}")
+
+
+class PoolUnavailable(RuntimeError):
+    """The worker pool broke while running a request (it has been replaced)."""
+
+
+class _ToolStats:
+    __slots__ = ("requests", "computed", "coalesced", "failed", "pool_errors", "running")
+
+    def __init__(self):
+        self.requests = 0
+        self.computed = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.pool_errors = 0
+        self.running = 0
+
+
+class MCPToolServer:
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8080,
+        workers=None,               # pool processes (default: CPU count)
+        limits=None,                # tool name -> max concurrent calls
+        start_method="spawn",       # TF is not fork-safe, and request threads are live
+    ):
+        if host != "localhost" and not ipaddress.ip_address(host).is_loopback:
+            raise ValueError(f"MCP server only binds to loopback, got {host}")
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.workers = workers or os.cpu_count() or 1
+        self._mp_context = mp.get_context(start_method) if start_method else None
+        self._pool = self._new_pool()
+        self.pool_restarts = 0
+        self._slots = {name: threading.BoundedSemaphore(self.limits.get(name, 1)) for name in TOOL_MODULES}
+        self._stats = {name: _ToolStats() for name in TOOL_MODULES}
+        self._inflight = {}                 # request key -> Future[(status, bytes)]
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = self
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+
+    def call(self, tool_name: str, params: dict):
+        """
+        Runs (or joins an identical in-flight run of) a tool.
+        Returns: (HTTP status, JSON bytes). Raises PoolUnavailable if the pool broke.
+        """
+        key = make_key(tool_name, params)
+        stats = self._stats[tool_name]
+        with self._lock:
+            stats.requests += 1
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+            else:
+                stats.coalesced += 1
+
+        if not leader:
+            return fut.result()
+
+        try:
+            with self._slots[tool_name]:
+                with self._lock:
+                    stats.running += 1
+                    pool = self._pool
+                try:
+                    status, body = pool.submit(_run_tool, tool_name, params).result()
+                finally:
+                    with self._lock:
+                        stats.running -= 1
+            with self._lock:
+                stats.computed += 1
+                stats.failed += status != 200
+            fut.set_result((status, body))
+        except BrokenProcessPool as e:
+            with self._lock:
+                stats.pool_errors += 1
+            self._replace_pool(pool)
+            fut.set_exception(PoolUnavailable(f"worker pool broke ({e}); restarted"))
+        except Exception as e:
+            # Not the tool (it reports its own errors): e.g. params that don't pickle
+            with self._lock:
+                stats.failed += 1
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return fut.result()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pool_restarts": self.pool_restarts,
+                "in_flight": len(self._inflight),
+                "tools": {
+                    name: {
+                        "limit": self.limits.get(name, 1),
+                        "requests": s.requests,
+                        "computed": s.computed,
+                        "coalesced": s.coalesced,
+                        "failed": s.failed,
+                        "pool_errors": s.pool_errors,
+                        "running": s.running,
+                    }
+                    for name, s in self._stats.items()
+                },
+            }
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._mp_context)
+
+    def _replace_pool(self, broken):
+        # Several requests may see the same broken pool: only the first replaces it
+        with self._lock:
+            if self._pool is not broken:
+                return
+            self._pool = self._new_pool()
+            self.pool_restarts += 1
+        logger.warning("Worker pool broke; started a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Serves on a background thread (returns immediately)."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mcp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread = None
+        self.httpd.server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"           # keep-alive for MCPClient's pooled session
+
+    def do_GET(self):
+        app = self.server.app
+        if self.path == "/health":
+            self._send(200, json.dumps({"ok": True, "tools": sorted(TOOL_MODULES)}).encode("utf-8"))
+        elif self.path == "/metrics":
+            self._send(200, json.dumps(app.metrics()).encode("utf-8"))
+        else:
+            self._error(404, f"Unknown path: {self.path}")
+
+    def do_POST(self):
+        tool_name = self.path.strip("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if tool_name not in TOOL_MODULES:
+            return self._error(404, f"Unknown tool: {tool_name}")
+        try:
+            params = json.loads(raw or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("params must be a JSON object")
+        except ValueError as e:
+            return self._error(400, f"Bad request body: {e}")
+
+        try:
+            status, body = self.server.app.call(tool_name, params)
+        except PoolUnavailable as e:
+            # Server-side failure: 5xx, so MCPClient retries and counts it toward its breaker
+            logger.warning(f"{tool_name}: {e}")
+            return self._error(503, str(e))
+        except Exception as e:
+            logger.warning(f"{tool_name} could not run: {e}")
+            return self._error(400, f"{type(e).__name__}: {e}")
+        if status != 200:
+            # The tool itself failed: 4xx so MCPClient neither retries nor trips its breaker
+            logger.warning(f"{tool_name} failed: {json.loads(body).get('error')}")
+        self._send(status, body)
+
+    def _error(self, status, message):
+        self._send(status, _error_body(message))
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt, *args)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local MCP tool server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = MCPToolServer(host=args.host, port=args.port, workers=args.workers)
+    logger.info(f"Serving {len(TOOL_MODULES)} tools on {server.url} ({server.workers} workers)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Pure-NumPy PHY layer used by the `backend="numpy"` tool path.
+
+Mirrors the Sionna pieces the tools use, without TensorFlow:
+  - Gray-labelled square QAM with Sionna's bit labelling
+    (real axis from even bits, imaginary axis from odd bits)
+  - AWGN and Rayleigh flat fading (CN(0, 1) taps)
+  - max-log / exact (APP) LLR demapping, LLR = log P(b=1) / P(b=0)
+  - importance-sampling channel draws with likelihood-ratio weights
+"""
+from functools import lru_cache
+
+import numpy as np
+
+
+def bits_per_symbol(modulation: str) -> int:
+    """qpsk -> 2, 16qam -> 4, ... Raises ValueError for unknown schemes."""
+    mod = modulation.lower()
+    if mod == "qpsk":
+        return 2
+    if "qam" in mod:
+        M = int(mod.replace("qam", ""))
+        return int(np.log2(M))
+    raise ValueError(f"Unknown modulation: {modulation}")
+
+
+def ebnodb2no(ebno_db, k, coderate=1.0):
+    """Noise variance N0 for a given Eb/N0 in dB (same definition as Sionna)."""
+    return 1.0 / (10 ** (np.asarray(ebno_db, dtype=np.float64) / 10) * coderate * k)
+
+
+def _pam_gray_levels(m):
+    """Amplitude of every m-bit Gray label (MSB first), Sionna pam_gray recursion."""
+    labels = np.arange(2 ** m)
+    bits = (labels[:, None] >> np.arange(m - 1, -1, -1)) & 1
+    v = 1 - 2 * bits[:, m - 1]
+    for j in range(m - 2, -1, -1):
+        v = (1 - 2 * bits[:, j]) * (2 ** (m - 1 - j) - v)
+    return v.astype(np.float64)
+
+
+@lru_cache(maxsize=None)
+def bit_table(k: int) -> np.ndarray:
+    """[2^k, k] uint8 table: symbol index -> bits (MSB first)."""
+    idx = np.arange(2 ** k)
+    return ((idx[:, None] >> np.arange(k - 1, -1, -1)) & 1).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def qam_constellation(k: int) -> np.ndarray:
+    """Unit-energy square QAM, point i labelled with the k-bit binary of i."""
+    if k % 2:
+        raise ValueError("Only square QAM (even bits per symbol) is supported.")
+    bits = bit_table(k).astype(np.int64)
+    m = k // 2
+    weights = 2 ** np.arange(m - 1, -1, -1)
+    levels = _pam_gray_levels(m)
+    re = levels[bits[:, 0::2] @ weights]
+    im = levels[bits[:, 1::2] @ weights]
+    pts = re + 1j * im
+    return pts / np.sqrt(np.mean(np.abs(pts) ** 2))
+
+
+@lru_cache(maxsize=None)
+def _slicer_tables(k: int):
+    """
+    (scale, table) for qam_hard_slice: `scale` maps unit-energy symbols back to
+    PAM amplitudes +-1, +-3, ...; table[re_pos, im_pos] is the symbol index of
+    the point at those per-axis amplitude positions.
+    """
+    if k % 2:
+        raise ValueError("Only square QAM (even bits per symbol) is supported.")
+    m = k // 2
+    L = 2 ** m
+    levels = _pam_gray_levels(m)                                 # label -> amplitude
+    label_at = np.empty(L, dtype=np.int64)
+    label_at[((levels + L - 1) // 2).astype(np.int64)] = np.arange(L)
+
+    # Real label bits sit at the even positions of the symbol index, imaginary at the odd ones
+    w = 1 << np.arange(k - 1, -1, -1)
+    re_part = bit_table(m)[label_at].astype(np.int64) @ w[0::2]
+    im_part = bit_table(m)[label_at].astype(np.int64) @ w[1::2]
+    table = re_part[:, None] + im_part[None, :]
+    return np.sqrt(2 * (L ** 2 - 1) / 3), table
+
+
+def qam_hard_slice(s, k):
+    """
+    Nearest-point hard decision for square QAM, O(1) per sample: each axis
+    is sliced as PAM (round + clip) instead of searching all M points.
+    s: complex [...] -> symbol indices [...]
+    """
+    scale, table = _slicer_tables(k)
+    top = table.shape[0] - 1
+    half = top / 2
+    re = np.clip(np.rint(s.real * (scale / 2) + half), 0, top).astype(np.intp)
+    im = np.clip(np.rint(s.imag * (scale / 2) + half), 0, top).astype(np.intp)
+    return table[re, im]
+
+
+@lru_cache(maxsize=None)
+def popcount_table(k: int) -> np.ndarray:
+    """[2^k] number of set bits: bit errors of a symbol error = popcount(idx ^ idx_hat)."""
+    return bit_table(k).sum(axis=1, dtype=np.int64)
+
+
+def bits_to_index(bits):
+    """bits: [..., k] -> symbol indices [...]"""
+    k = bits.shape[-1]
+    return bits.astype(np.int64) @ (1 << np.arange(k - 1, -1, -1))
+
+
+def index_to_bits(idx, k):
+    """idx: [...] -> bits [..., k] via table lookup."""
+    return bit_table(k)[idx]
+
+
+def random_bits(rng, n, k):
+    return rng.integers(0, 2, size=(n, k), dtype=np.uint8)
+
+
+def map_bits(bits, k):
+    """bits: [N, k] -> symbols [N]"""
+    return qam_constellation(k)[bits_to_index(bits)]
+
+
+def complex_normal(rng, shape, var=1.0):
+    """CN(0, var) samples."""
+    std = np.sqrt(np.asarray(var) / 2)
+    return std * (rng.standard_normal(shape) + 1j * rng.standard_normal(shape))
+
+
+def awgn(rng, x, no):
+    return x + complex_normal(rng, x.shape, no)
+
+
+def rayleigh_flat(rng, x, no):
+    """SISO flat Rayleigh fading + AWGN. Returns: y, h"""
+    h = complex_normal(rng, x.shape)
+    return h * x + complex_normal(rng, x.shape, no), h
+
+
+def importance_channel(rng, x, no, k, fading=False):
+    """
+    AWGN / Rayleigh channel drawn from a biased density, for rare-error BER.
+    Noise comes from a defensive mixture: CN(0, no) or CN(mu, no), with
+    mu = one of the four shifts to the nearest decision boundaries (half
+    the minimum distance, times h under fading), each picked with prob 1/5.
+    Under fading, h comes from CN(0, 1) or CN(0, lam) with prob 1/2 each,
+    lam = 1 / (1 + d^2/no) (deep fades, where the errors are).
+    The weight w = p / q of each symbol is at most 5 (10 with fading), so an
+    estimate sum(w * errors) / n is unbiased and never much worse than plain
+    Monte Carlo.
+    Returns: y, h (None for AWGN), w  ([N] each)
+    """
+    L = 2 ** (k // 2)
+    d = 1 / np.sqrt(2 * (L ** 2 - 1) / 3)                      # unit-energy QAM: half min distance
+    shifts = d * np.array([0, 1, -1, 1j, -1j])
+    n_sym = x.shape[0]
+
+    log_w = np.zeros(n_sym)
+    if fading:
+        lam = 1 / (1 + d * d / no)
+        h = complex_normal(rng, n_sym, np.where(rng.random(n_sym) < 0.5, 1.0, lam))
+        h2 = h.real ** 2 + h.imag ** 2
+        # p(h) / q(h) with q = (p + q_lam) / 2
+        log_w -= np.log(0.5 + 0.5 / lam * np.exp(-h2 * (1 / lam - 1)))
+        mus = shifts[None, :] * h[:, None]                    # [N, 5]
+    else:
+        h = None
+        mus = np.broadcast_to(shifts, (n_sym, shifts.size))
+
+    n = mus[np.arange(n_sym), rng.integers(0, shifts.size, n_sym)] + complex_normal(rng, n_sym, no)
+    # p(n) / q(n) = 1 / mean_j exp((2 Re(n conj mu_j) - |mu_j|^2) / no)
+    t = (2 * (n[:, None] * np.conj(mus)).real - np.abs(mus) ** 2) / no
+    log_w -= _logsumexp(t) - np.log(shifts.size)
+    y = (x if h is None else h * x) + n
+    return y, h, np.exp(log_w)
+
+
+def demap_llr(y, no, k, h=None, method="app"):
+    """
+    Per-bit LLRs for Gray square QAM.
+    y, h: [N] complex (h=None -> AWGN), no: noise variance
+    method: "app" (exact log-sum-exp) or "maxlog"
+    Returns: [N, k] LLRs, positive -> bit 1
+    """
+    const = qam_constellation(k)
+    rx = const[None, :] if h is None else h[:, None] * const[None, :]
+    metric = -np.abs(y[:, None] - rx) ** 2 / no                 # [N, M]
+
+    one = bit_table(k).T.astype(bool)                           # [k, M]
+    llr = np.empty((y.shape[0], k))
+    for i in range(k):
+        m1 = metric[:, one[i]]
+        m0 = metric[:, ~one[i]]
+        if method == "maxlog":
+            llr[:, i] = m1.max(axis=1) - m0.max(axis=1)
+        else:
+            llr[:, i] = _logsumexp(m1) - _logsumexp(m0)
+    return llr
+
+
+def _logsumexp(a):
+    amax = a.max(axis=1)
+    return amax + np.log(np.sum(np.exp(a - amax[:, None]), axis=1))
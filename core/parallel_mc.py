@@ -0,0 +1,87 @@
+"""
+Process-pool execution for Monte Carlo BER sweeps.
+
+The (point, bit-chunk) grid is split into shards. A point is one SNR value,
+or one (config, SNR) cell for MIMO. A shard is a range of batch indices of
+one point; every batch draws from its own counter-based stream keyed by
+(seed, point, batch index) (core.rng), so the merged counts don't depend on
+how the batches were split, on which worker or in which order they ran,
+and match the serial loop bit for bit. Shards run on a ProcessPoolExecutor
+and their error/bit counts are merged back per point.
+
+Batch indices of a point continue after the bits already stored for it
+(prev), so a top-up draws fresh batches instead of replaying stored ones.
+
+Without an adaptive stopping rule, every point's missing bits are split into
+`workers` shards and dispatched in a single round. With target_errors /
+ci_rel_width, shards go out in rounds of at most `chunk_batches` batches per
+shard, and the rule is re-evaluated on the merged counts after each round.
+"""
+import math
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+
+def split_batches(n_batches, parts):
+    """Splits n_batches into at most `parts` near-equal positive chunks."""
+    parts = max(1, min(parts, n_batches))
+    base, extra = divmod(n_batches, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def first_batch(prev_bits, batch_bits):
+    """Index of a point's first new batch: stored bits count as batches already drawn."""
+    return prev_bits // batch_bits
+
+
+def run_sharded(
+    shard_fn,
+    specs,
+    prev,
+    rule,
+    batch_bits,
+    workers,
+    start_method=None,
+    chunk_batches=8,
+    seed=0,
+):
+    """
+    shard_fn(spec, first_batch, n_batches, seed) -> (n_err, n_tot), top-level (picklable);
+             runs batches first_batch .. first_batch + n_batches - 1 of the point
+    specs:   picklable per-point descriptions handed to shard_fn
+    prev:    [(n_err, n_tot)] counts already accumulated per point (e.g. from a BerStore)
+    batch_bits: bits per shard_fn batch, one int or one per spec
+    Returns: [(n_err, n_tot)] new counts per point
+    """
+    new = [[0, 0] for _ in specs]
+    bits = [batch_bits[i] if isinstance(batch_bits, (list, tuple)) else batch_bits for i in range(len(specs))]
+    next_batch = [first_batch(tot, b) for (_, tot), b in zip(prev, bits)]
+    adaptive = rule.target_errors is not None or rule.ci_rel_width is not None
+    ctx = mp.get_context(start_method) if start_method else None
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        while True:
+            futures = []
+            for i, spec in enumerate(specs):
+                n_err = prev[i][0] + new[i][0]
+                n_tot = prev[i][1] + new[i][1]
+                if rule.done(n_err, n_tot):
+                    continue
+                need = math.ceil((rule.cap - n_tot) / bits[i])
+                if adaptive:
+                    need = min(need, chunk_batches * workers)
+                for n_batches in split_batches(need, workers):
+                    fut = pool.submit(shard_fn, spec, next_batch[i], n_batches, seed)
+                    futures.append((i, fut))
+                    next_batch[i] += n_batches
+
+            if not futures:
+                break
+            for i, fut in futures:
+                e, t = fut.result()
+                new[i][0] += e
+                new[i][1] += t
+            if not adaptive:
+                break
+
+    return [tuple(c) for c in new]
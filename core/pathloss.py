@@ -0,0 +1,168 @@
+"""
+Shared analytical pathloss kernel for the radio-map tools.
+
+Computes the received power of every grid pixel for every transmitter in one
+broadcasted NumPy operation instead of nested per-pixel Python loops.
+combine_received_power() folds transmitters into a running max / linear sum
+per tile instead, so the per-TX stack is never held in full.
+serving_power() does the same fold for coverage KPIs: strongest TX (power and
+index) plus total linear power, from which SINR follows without a second pass.
+"""
+import numpy as np
+
+C_LIGHT = 3e8
+DISTANCE_EPS = 1e-6
+TX_CHUNK_ELEMENTS = 1 << 22      # per-TX tile values live at once (32 MiB in float64)
+THERMAL_NOISE_DBM_HZ = -174.0    # kT at 290 K
+
+
+def resolve_dtype(dtype):
+    """Accepts "float32"/"float64" (or a NumPy dtype) and returns the NumPy dtype."""
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f"Unsupported dtype: {dtype} (use float32 or float64)")
+    return dtype
+
+
+def grid_axes(rx_grid_size, area_size, dtype=np.float64):
+    """
+    Receiver grid axes centred on the origin.
+    Returns: xs [G], ys [G]
+    """
+    w, h = area_size
+    xs = np.linspace(-w/2, w/2, rx_grid_size).astype(dtype, copy=False)
+    ys = np.linspace(-h/2, h/2, rx_grid_size).astype(dtype, copy=False)
+    return xs, ys
+
+
+def thermal_noise_dbm(bandwidth_hz, noise_figure_db=0.0):
+    """Receiver noise floor over the bandwidth, in dBm."""
+    return THERMAL_NOISE_DBM_HZ + 10*np.log10(bandwidth_hz) + noise_figure_db
+
+
+def fspl_constant_db(frequency_hz):
+    """Free-space term 20*log10(4*pi/lambda) in dB."""
+    lam = C_LIGHT / frequency_hz
+    return 20*np.log10(4*np.pi/lam)
+
+
+def received_power_dbm(
+    tx_positions,
+    xs,
+    ys,
+    frequency_hz=3.5e9,
+    tx_power_dbm=30.0,
+    pathloss_exp=2.2,
+    dtype=np.float64
+):
+    """
+    Free-space + pathloss exponent received power for all TX over the grid.
+
+    tx_positions: [N, 3] (x, y, z) per transmitter
+    tx_power_dbm: scalar or [N] per-transmitter power
+    Returns: [N, len(ys), len(xs)] array in dBm (row = y, column = x)
+    """
+    dtype = resolve_dtype(dtype)
+    tx = np.asarray(tx_positions, dtype=dtype).reshape(-1, 3)
+    xs = np.asarray(xs, dtype=dtype)
+    ys = np.asarray(ys, dtype=dtype)
+    p_tx = np.broadcast_to(np.asarray(tx_power_dbm, dtype=dtype), (tx.shape[0],))
+
+    fspl_const = dtype.type(fspl_constant_db(frequency_hz))
+    n10 = dtype.type(10*pathloss_exp)
+
+    dx2 = (xs[None, None, :] - tx[:, 0, None, None])**2      # [N, 1, G]
+    dy2 = (ys[None, :, None] - tx[:, 1, None, None])**2      # [N, G, 1]
+    dz2 = (tx[:, 2, None, None])**2                          # [N, 1, 1]
+
+    d = np.sqrt(dx2 + dy2 + dz2) + dtype.type(DISTANCE_EPS)  # [N, G, G]
+    pl_db = fspl_const + n10*np.log10(d)
+    return p_tx[:, None, None] - pl_db
+
+
+def combine_received_power(
+    tx_positions,
+    xs,
+    ys,
+    combine_mode="max",
+    frequency_hz=3.5e9,
+    tx_power_dbm=30.0,
+    pathloss_exp=2.2,
+    dtype=np.float64,
+    max_elements=TX_CHUNK_ELEMENTS
+):
+    """
+    Combined received power of all TX over one tile of the grid.
+
+    Transmitters are computed in chunks of at most `max_elements` values and
+    folded into a running accumulator: max in dBm ("max"), or sum in linear mW
+    ("sum"). Memory is O(tile) whatever the number of transmitters.
+    Returns: [len(ys), len(xs)] array in dBm
+    """
+    dtype = resolve_dtype(dtype)
+    tx = np.asarray(tx_positions, dtype=dtype).reshape(-1, 3)
+    p_tx = np.broadcast_to(np.asarray(tx_power_dbm, dtype=dtype), (tx.shape[0],))
+    chunk = max(1, max_elements // max(1, len(xs) * len(ys)))
+
+    acc = None
+    for t0 in range(0, tx.shape[0], chunk):
+        p = received_power_dbm(
+            tx[t0:t0 + chunk], xs, ys,
+            frequency_hz=frequency_hz,
+            tx_power_dbm=p_tx[t0:t0 + chunk],
+            pathloss_exp=pathloss_exp,
+            dtype=dtype
+        )
+        if combine_mode == "sum":
+            part = np.sum(10 ** (p/10), axis=0)
+            acc = part if acc is None else np.add(acc, part, out=acc)
+        else:
+            part = np.max(p, axis=0)
+            acc = part if acc is None else np.maximum(acc, part, out=acc)
+
+    if combine_mode == "sum":
+        # sum in linear mW then back to dBm
+        return 10*np.log10(acc)
+    return acc
+
+
+def serving_power(
+    tx_positions,
+    xs,
+    ys,
+    frequency_hz=3.5e9,
+    tx_power_dbm=30.0,
+    pathloss_exp=2.2,
+    dtype=np.float64,
+    max_elements=TX_CHUNK_ELEMENTS
+):
+    """
+    Serving (strongest) TX and total received power over one tile, in the
+    same chunked fold as combine_received_power (ties go to the lower index).
+    Returns: best_dbm [len(ys), len(xs)], best_tx (int32, same shape), total_mw (same shape)
+    """
+    dtype = resolve_dtype(dtype)
+    tx = np.asarray(tx_positions, dtype=dtype).reshape(-1, 3)
+    p_tx = np.broadcast_to(np.asarray(tx_power_dbm, dtype=dtype), (tx.shape[0],))
+    chunk = max(1, max_elements // max(1, len(xs) * len(ys)))
+
+    best = best_tx = total = None
+    for t0 in range(0, tx.shape[0], chunk):
+        p = received_power_dbm(
+            tx[t0:t0 + chunk], xs, ys,
+            frequency_hz=frequency_hz,
+            tx_power_dbm=p_tx[t0:t0 + chunk],
+            pathloss_exp=pathloss_exp,
+            dtype=dtype
+        )
+        idx = np.argmax(p, axis=0)
+        part = np.take_along_axis(p, idx[None], axis=0)[0]
+        lin = np.sum(10 ** (p/10), axis=0)
+        if best is None:
+            best, best_tx, total = part, (idx + t0).astype(np.int32), lin
+            continue
+        better = part > best
+        np.copyto(best, part, where=better)
+        np.copyto(best_tx, idx + t0, where=better, casting="unsafe")
+        np.add(total, lin, out=total)
+    return best, best_tx, total
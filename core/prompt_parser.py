@@ -0,0 +1,164 @@
+"""
+Compiled prompt parser shared by InterpreterAgent, ParameterExtractorAgent
+and TaskDecomposer.
+
+One regex alternation over every keyword (longest first) finds all keywords
+in a single left-to-right pass over the lowered prompt. As in an
+Aho-Corasick automaton, overlaps are resolved from precomputed tables:
+keywords nested inside a hit are implied by it, and only hits whose suffix
+can start another keyword resume the scan one character later.
+Classification and the flag-style parameters (modulation, channel, combine
+mode) are then set lookups. Numeric patterns
+are compiled once and only run for the task types that need them.
+
+Results are memoized per prompt (LRU), so repeated prompts from bulk eval or
+log replay cost a dict lookup plus a copy of the params.
+"""
+import re
+from functools import lru_cache
+
+from core.schemas import TaskSpec
+
+MIMO_KEYWORDS = ("mimo", "1x1", "2x2", "4x4", "8x8", "antenna", "antennas")
+MULTI_MAP_KEYWORDS = ("multi-transmitter", "multiple tx", "many transmitters")
+RADIO_MAP_KEYWORDS = ("radio map", "heatmap", "coverage")
+BER_KEYWORDS = ("ber", "bit error", "error rate")
+CONSTELLATION_KEYWORDS = ("constellation", "scatter", "symbol plot", "iq plot")
+MODULATIONS = ("qpsk", "16qam", "64qam", "256qam")          # priority order
+FADING_KEYWORDS = ("rayleigh", "fading")
+SUM_KEYWORDS = ("sum", "adding", "aggregate")
+
+KEYWORDS = frozenset(
+    MIMO_KEYWORDS + MULTI_MAP_KEYWORDS + RADIO_MAP_KEYWORDS + BER_KEYWORDS
+    + CONSTELLATION_KEYWORDS + MODULATIONS + FADING_KEYWORDS + SUM_KEYWORDS + ("multi",)
+)
+
+_SCAN = re.compile("|".join(re.escape(k) for k in sorted(KEYWORDS, key=len, reverse=True)))
+# A hit on "antennas" also means "antenna" occurs, etc.
+_IMPLIED = {kw: frozenset(o for o in KEYWORDS if o in kw) for kw in KEYWORDS}
+# Hits whose proper suffix is a prefix of some keyword ("sum" -> "mimo" in "summimo")
+_OVERLAPPING = frozenset(
+    a for a in KEYWORDS
+    if any(b.startswith(a[i:]) and len(b) > len(a) - i for b in KEYWORDS for i in range(1, len(a)))
+)
+
+_SNR = re.compile(r"snr\s*[=:]?\s*(-?\d+(\.\d+)?)")
+_RANGE = re.compile(r"from\s*(-?\d+)\s*to\s*(-?\d+)")
+_INT = re.compile(r"-?\d+")
+_MIMO_CFG = re.compile(r"(\d+)\s*x\s*(\d+)")
+_TX = re.compile(r"\(([-\d.]+),\s*([-\d.]+),\s*([-\d.]+)\)")
+
+DEFAULT_SNR_LIST = [-5, 0, 5, 10, 15]
+DEFAULT_CONFIGS = [{"nt": 1, "nr": 1}, {"nt": 4, "nr": 4}]
+DEFAULT_TX = [0, 0, 10]
+DEFAULT_TX_POSITIONS = [[0, 0, 10], [60, 0, 10], [-60, 0, 10]]
+
+
+def scan_keywords(text: str) -> frozenset:
+    """All KEYWORDS occurring in (lowered) text, found in one regex pass."""
+    found = set()
+    search = _SCAN.search
+    m = search(text)
+    while m is not None:
+        kw = m.group()
+        found |= _IMPLIED[kw]
+        m = search(text, m.start() + 1 if kw in _OVERLAPPING else m.end())
+    return frozenset(found)
+
+
+def classify_hits(hits) -> tuple:
+    """(task_type, classified): classified is False for the constellation fallback."""
+    if hits.intersection(MIMO_KEYWORDS):
+        return "mimo_comparison", True
+    if ("multi" in hits and "radio map" in hits) or hits.intersection(MULTI_MAP_KEYWORDS):
+        return "multi_radio_map", True
+    if hits.intersection(RADIO_MAP_KEYWORDS):
+        return "radiomap", True
+    if hits.intersection(BER_KEYWORDS):
+        return "ber", True
+    if hits.intersection(CONSTELLATION_KEYWORDS):
+        return "constellation", True
+    return "constellation", False
+
+
+@lru_cache(maxsize=8192)
+def _scan(prompt: str):
+    text = prompt.lower()
+    hits = scan_keywords(text)
+    return text, hits, classify_hits(hits)
+
+
+@lru_cache(maxsize=8192)
+def _extract(prompt: str, task_type: str) -> dict:
+    text, hits, _ = _scan(prompt)
+    params = {}
+
+    if task_type in ("constellation", "ber", "mimo_comparison"):
+        params["modulation"] = next((m for m in MODULATIONS if m in hits), "qpsk")
+
+    if task_type == "constellation":
+        m = _SNR.search(text)
+        params["snr_db"] = float(m.group(1)) if m else 10.0
+    elif task_type == "ber":
+        params["channel"] = "rayleigh" if hits.intersection(FADING_KEYWORDS) else "awgn"
+        params["snr_db_list"] = _snr_list(text)
+    elif task_type == "mimo_comparison":
+        params["snr_db_list"] = _snr_list(text)
+        cfgs = _MIMO_CFG.findall(text)
+        params["configs"] = [{"nt": int(a), "nr": int(b)} for a, b in cfgs] or DEFAULT_CONFIGS
+    elif task_type == "radiomap":
+        txs = _TX.findall(text)
+        params["tx_pos"] = [float(v) for v in txs[0]] if txs else DEFAULT_TX
+    elif task_type == "multi_radio_map":
+        txs = _TX.findall(text)
+        params["tx_positions"] = [[float(v) for v in t] for t in txs] if txs else DEFAULT_TX_POSITIONS
+        params["combine_mode"] = "sum" if hits.intersection(SUM_KEYWORDS) else "max"
+    return params
+
+
+def _snr_list(text):
+    # "from -5 to 15" first, then any explicit list of 2+ integers
+    m = _RANGE.search(text)
+    if m:
+        a, b = int(m.group(1)), int(m.group(2))
+        step = 5 if abs(b - a) >= 10 else 1
+        return list(range(a, b + 1, step))
+    nums = [int(n) for n in _INT.findall(text)]
+    if len(nums) >= 2:
+        return nums
+    return DEFAULT_SNR_LIST
+
+
+def _copy(params):
+    # Memoized params are shared: hand out fresh lists/dicts (values nest at most
+    # two deep: snr lists, tx position lists, config dicts)
+    out = {}
+    for key, v in params.items():
+        if type(v) is list:
+            v = [x.copy() if type(x) in (list, dict) else x for x in v]
+        out[key] = v
+    return out
+
+
+def classify(prompt: str) -> tuple:
+    """(task_type, classified)"""
+    return _scan(prompt)[2]
+
+
+def extract(prompt: str, task_type: str) -> dict:
+    return _copy(_extract(prompt, task_type))
+
+
+def run(prompt: str) -> TaskSpec:
+    """Classify + extract in one call."""
+    task_type, _ = classify(prompt)
+    return TaskSpec(task_type=task_type, parameters=extract(prompt, task_type), raw_prompt=prompt)
+
+
+def run_many(prompts) -> list:
+    """Bulk run(); duplicate prompts are parsed once."""
+    return [run(p) for p in prompts]
+
+
+def cache_info():
+    return {"scan": _scan.cache_info()._asdict(), "extract": _extract.cache_info()._asdict()}
@@ -0,0 +1,330 @@
+"""
+Incremental multi-TX radio map for interactive site planning.
+
+RadioMapSession keeps every transmitter's [G, G] contribution, keyed by
+(position, power, frequency), plus a running combined map, so adding,
+moving or removing one transmitter costs one transmitter's pathloss pass
+instead of N. Both modes keep two accumulators, so the combined map and the
+coverage outputs (serving TX, SINR) never loop over all transmitters:
+  - linear power (mW) total; add / remove are += / -= of one contribution.
+    It is rebuilt from the cached contributions (no pathloss recompute)
+    every `rebuild_every` removals to bound cancellation error. This is
+    the "sum" map.
+  - per-pixel top-2 (best / second-best power and their TX). Adding is two
+    masked compares. On removal, the pixels the TX led promote their
+    runner-up, and only the pixels that lost their top-1 or top-2 rescan
+    the cached contributions for a new second best. The best power is the
+    "max" map.
+
+Contributions of transmitters that were moved away or removed stay in a
+small LRU, so moving a TX back (undo) is free.
+
+    session = RadioMapSession(rx_grid_size=200, combine_mode="max")
+    a = session.add((0, 0, 10))
+    b = session.add((60, 0, 10))
+    session.move(b, (80, 0, 10))
+    payload = session.payload(out_dir="outputs", render="none")
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from core.pathloss import grid_axes, received_power_dbm, resolve_dtype, thermal_noise_dbm
+from core.render import plot_path, render as render_plot
+from core.tracing import span
+
+
+class RadioMapSession:
+    def __init__(
+        self,
+        rx_grid_size=80,
+        area_size=(200, 200),
+        frequency_hz=3.5e9,         # default per TX
+        tx_power_dbm=30.0,          # default per TX
+        pathloss_exp=2.2,
+        combine_mode="max",         # "max" or "sum"
+        dtype="float64",
+        spare_contributions=16,     # inactive contributions kept for undo / move back
+        rebuild_every=64            # exact rebuild of the linear total after this many removals
+    ):
+        if combine_mode not in ("max", "sum"):
+            raise ValueError(f"Unknown combine_mode: {combine_mode}")
+        self.rx_grid_size = rx_grid_size
+        self.area_size = area_size
+        self.frequency_hz = frequency_hz
+        self.tx_power_dbm = tx_power_dbm
+        self.pathloss_exp = pathloss_exp
+        self.combine_mode = combine_mode
+        self.dtype = resolve_dtype(dtype)
+        self.spare_contributions = spare_contributions
+        self.rebuild_every = rebuild_every
+
+        self.xs, self.ys = grid_axes(rx_grid_size, area_size, self.dtype)
+        shape = (len(self.ys), len(self.xs))
+
+        self._tx = OrderedDict()           # tx_id -> key (insertion order = TX order)
+        self._contrib = {}                 # key -> [G, G] dBm, for active TX
+        self._refs = {}                    # key -> number of active TX using it
+        self._spare = OrderedDict()        # key -> [G, G] dBm, recently dropped (LRU)
+        self._next_id = 0
+        self.computed = 0                  # pathloss passes run (cache misses)
+        self._removals = 0
+
+        self._lin = np.zeros(shape, dtype=self.dtype)
+        self._best = np.full(shape, -np.inf, dtype=self.dtype)
+        self._second = np.full(shape, -np.inf, dtype=self.dtype)
+        self._best_id = np.full(shape, -1, dtype=np.int64)
+        self._second_id = np.full(shape, -1, dtype=np.int64)
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+
+    def add(self, tx_pos, tx_power_dbm=None, frequency_hz=None) -> int:
+        """Adds a transmitter. Returns its id."""
+        tx_id = self._next_id
+        self._next_id += 1
+        key = self._key(tx_pos, tx_power_dbm, frequency_hz)
+        self._tx[tx_id] = key
+        self._fold_in(tx_id, self._acquire(key))
+        return tx_id
+
+    def remove(self, tx_id):
+        key = self._tx.pop(tx_id)
+        self._fold_out(tx_id, self._release(key))
+
+    def move(self, tx_id, tx_pos=None, tx_power_dbm=None, frequency_hz=None):
+        """Changes one transmitter's position / power / frequency (unset: keep)."""
+        old = self._tx[tx_id]
+        key = self._key(
+            old[0] if tx_pos is None else tx_pos,
+            old[1] if tx_power_dbm is None else tx_power_dbm,
+            old[2] if frequency_hz is None else frequency_hz,
+        )
+        if key == old:
+            return
+        self.remove(tx_id)
+        self._tx[tx_id] = key
+        self._fold_in(tx_id, self._acquire(key))
+
+    def update(self, tx_positions, tx_power_dbm=None, frequency_hz=None):
+        """
+        Syncs the session to a full transmitter list (simulate_multi_radio_map
+        style): unchanged TX are kept, only added / dropped ones cost anything.
+        tx_power_dbm: scalar or per-TX list. Returns the TX ids in list order.
+        """
+        n = len(tx_positions)
+        powers = tx_power_dbm if isinstance(tx_power_dbm, (list, tuple, np.ndarray)) else [tx_power_dbm] * n
+        keys = [self._key(pos, pw, frequency_hz) for pos, pw in zip(tx_positions, powers)]
+
+        free = {}
+        for tx_id, key in self._tx.items():
+            free.setdefault(key, []).append(tx_id)
+        ids = [free[key].pop(0) if free.get(key) else None for key in keys]
+        for leftover in free.values():
+            for tx_id in leftover:
+                self.remove(tx_id)
+        return [tx_id if tx_id is not None else self.add(*key) for tx_id, key in zip(ids, keys)]
+
+    @property
+    def tx_ids(self):
+        return list(self._tx)
+
+    def transmitters(self):
+        """[(tx_id, (x, y, z), tx_power_dbm, frequency_hz)]"""
+        return [(tx_id, list(key[0]), key[1], key[2]) for tx_id, key in self._tx.items()]
+
+    def combined(self):
+        """Combined map [G, G] in dBm (-inf where there is no TX)."""
+        if self.combine_mode == "sum":
+            with np.errstate(divide="ignore"):
+                return 10*np.log10(np.maximum(self._lin, 0))
+        return self._best.copy()
+
+    def best_server(self):
+        """"max": id of the strongest TX per pixel (-1: none)."""
+        if self.combine_mode != "max":
+            raise ValueError("best_server() needs combine_mode='max'")
+        return self._best_id.copy()
+
+    def payload(
+        self,
+        out_dir="outputs",
+        render="sync",
+        coverage=True,
+        rsrp_threshold_dbm=-100.0,
+        sinr_threshold_db=0.0,
+        bandwidth_hz=20e6,
+        noise_figure_db=7.0
+    ):
+        """
+        Same payload as simulate_multi_radio_map for the current transmitters.
+        TX indices (data["best_server"], tx_coverage_share_pct) follow tx_ids
+        order; frequency_hz / tx_power_dbm are per-TX lists when they differ.
+        Coverage comes from the running accumulators (no per-TX pass).
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        keys = list(self._tx.values())
+        tx_positions = [list(key[0]) for key in keys]
+        tx_power_dbm = _scalar_or_list([key[1] for key in keys], self.tx_power_dbm)
+        frequency_hz = _scalar_or_list([key[2] for key in keys], self.frequency_hz)
+        data = {
+            "power_dbm": self.combined().astype(np.float32),
+            "extent": [float(self.xs[0]), float(self.xs[-1]), float(self.ys[0]), float(self.ys[-1])],
+        }
+        kpis = {
+            "tx_positions": tx_positions,
+            "rx_grid_size": self.rx_grid_size,
+            "area_size": self.area_size,
+            "frequency_hz": frequency_hz,
+            "tx_power_dbm": tx_power_dbm,
+            "combine_mode": self.combine_mode,
+            "out_npy": None,
+            "tx_ids": self.tx_ids,
+            "pathloss_passes": self.computed
+        }
+        if coverage:
+            with span("coverage"):
+                self._coverage(
+                    data, kpis, rsrp_threshold_dbm, sinr_threshold_db, thermal_noise_dbm(bandwidth_hz, noise_figure_db)
+                )
+
+        path = plot_path(out_dir, "radio_map_multi_tx", [
+            tx_positions, self.rx_grid_size, self.area_size, frequency_hz, tx_power_dbm,
+            self.pathloss_exp, self.combine_mode, self.dtype.name
+        ])
+        with span("plot"):
+            plots = render_plot(
+                "radio_map", path, data, mode=render,
+                title=f"Multi-TX Radio Map (combine={self.combine_mode})", tx_positions=tx_positions
+            )
+        return {"plots": plots, "kpis": kpis, "data": data}
+
+    def _coverage(self, data, kpis, rsrp_threshold_dbm, sinr_threshold_db, noise_dbm):
+        # Serving TX / total power per pixel from the accumulators, then the
+        # same SINR and coverage figures as simulate_multi_radio_map
+        best, total = self._best, self._lin
+        index = np.full(self._next_id + 1, -1, dtype=np.int32)    # tx_id -> position in tx_ids; [-1] -> -1
+        index[self.tx_ids] = np.arange(len(self._tx), dtype=np.int32)
+        best_tx = index[self._best_id]
+
+        noise_mw = 10 ** (noise_dbm/10)
+        interference = np.maximum(total - 10 ** (best/10), 0) + noise_mw
+        sinr = best - 10*np.log10(interference)
+        ok_rsrp = best >= rsrp_threshold_dbm
+        ok_sinr = sinr >= sinr_threshold_db
+        ok = ok_rsrp & ok_sinr
+        per_tx = np.bincount(best_tx[ok], minlength=len(self._tx))
+
+        n_px = best.size
+        both = int(np.count_nonzero(ok))
+        data["best_server"] = best_tx
+        data["sinr_db"] = sinr.astype(np.float32)
+        kpis.update({
+            "rsrp_threshold_dbm": rsrp_threshold_dbm,
+            "sinr_threshold_db": sinr_threshold_db,
+            "noise_dbm": float(noise_dbm),
+            "coverage_rsrp_pct": 100.0 * np.count_nonzero(ok_rsrp) / n_px,
+            "coverage_sinr_pct": 100.0 * np.count_nonzero(ok_sinr) / n_px,
+            "coverage_pct": 100.0 * both / n_px,
+            "tx_coverage_share_pct": [100.0 * int(n) / both if both else 0.0 for n in per_tx],
+        })
+
+    # -------------------------
+    # CONTRIBUTIONS
+    # -------------------------
+
+    def _key(self, tx_pos, tx_power_dbm=None, frequency_hz=None):
+        return (
+            tuple(float(v) for v in tx_pos),
+            float(self.tx_power_dbm if tx_power_dbm is None else tx_power_dbm),
+            float(self.frequency_hz if frequency_hz is None else frequency_hz),
+        )
+
+    def _acquire(self, key):
+        p = self._contrib.get(key)
+        if p is None:
+            p = self._spare.pop(key, None)
+        if p is None:
+            with span("pathloss"):
+                p = received_power_dbm(
+                    [key[0]], self.xs, self.ys,
+                    frequency_hz=key[2],
+                    tx_power_dbm=key[1],
+                    pathloss_exp=self.pathloss_exp,
+                    dtype=self.dtype
+                )[0]
+            self.computed += 1
+        self._contrib[key] = p
+        self._refs[key] = self._refs.get(key, 0) + 1
+        return p
+
+    def _release(self, key):
+        p = self._contrib[key]
+        self._refs[key] -= 1
+        if not self._refs[key]:
+            # Last TX with this key is gone: keep its contribution as a spare
+            del self._refs[key], self._contrib[key]
+            self._spare[key] = p
+            while len(self._spare) > self.spare_contributions:
+                self._spare.popitem(last=False)
+        return p
+
+    # -------------------------
+    # ACCUMULATORS
+    # -------------------------
+
+    def _fold_in(self, tx_id, p):
+        with span("combine"):
+            self._lin += 10 ** (p/10)
+            top = p > self._best
+            runner_up = ~top & (p > self._second)
+            np.copyto(self._second, p, where=runner_up)
+            np.copyto(self._second_id, tx_id, where=runner_up)
+            np.copyto(self._second, self._best, where=top)
+            np.copyto(self._second_id, self._best_id, where=top)
+            np.copyto(self._best, p, where=top)
+            np.copyto(self._best_id, tx_id, where=top)
+
+    def _fold_out(self, tx_id, p):
+        with span("combine"):
+            self._removals += 1
+            if not self._tx:
+                self._lin[:] = 0
+            elif self._removals % self.rebuild_every == 0:
+                self._rebuild_lin()
+            else:
+                self._lin -= 10 ** (p/10)
+
+            led = self._best_id == tx_id
+            np.copyto(self._best, self._second, where=led)
+            np.copyto(self._best_id, self._second_id, where=led)
+            stale = led | (self._second_id == tx_id)
+            if stale.any():
+                self._rescan_second(stale)
+
+    def _rebuild_lin(self):
+        self._lin[:] = 0
+        for key in self._tx.values():
+            self._lin += 10 ** (self._contrib[key]/10)
+
+    def _rescan_second(self, mask):
+        # New runner-up at the masked pixels: best of every active TX except the leader
+        second = np.full(int(mask.sum()), -np.inf, dtype=self.dtype)
+        second_id = np.full(second.shape, -1, dtype=np.int64)
+        best_id = self._best_id[mask]
+        for tx_id, key in self._tx.items():
+            v = self._contrib[key][mask]
+            better = (v > second) & (best_id != tx_id)
+            second = np.where(better, v, second)
+            second_id = np.where(better, tx_id, second_id)
+        self._second[mask] = second
+        self._second_id[mask] = second_id
+
+
+def _scalar_or_list(values, default):
+    """One value when all TX share it (or there are none), else the per-TX list."""
+    if not values:
+        return default
+    return values[0] if len(set(values)) == 1 else values
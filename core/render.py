@@ -0,0 +1,172 @@
+"""
+PNG rendering, decoupled from the simulation tools.
+
+Tools compute first and return their raw arrays under payload["data"]
+(float32 / complex64). They then hand the arrays to render(), which
+works in one of three modes:
+  - "sync":       draw and save now, on the caller's thread (the old behaviour)
+  - "background": queue on a small render pool and return the path right away.
+                  Call wait_for(paths) before serving the file.
+  - "none":       skip the image; callers that only need KPIs/arrays
+
+Figures use the Agg canvas object API (no pyplot global state), so renders
+are safe to run concurrently. matplotlib is imported lazily on the first
+render.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+RENDER_MODES = ("sync", "background", "none")
+
+logger = logging.getLogger("Render")
+
+
+def plot_path(out_dir, stem, params) -> str:
+    """<out_dir>/<stem>_<hash>.png, hash over the params that shape the plot."""
+    from core.result_cache import canonicalize
+
+    blob = json.dumps(canonicalize(params), sort_keys=True, default=repr)
+    return os.path.join(out_dir, f"{stem}_{hashlib.sha1(blob.encode('utf-8')).hexdigest()[:10]}.png")
+
+
+# ---- drawers: (fig, data, **style) ----
+
+def _draw_ber(fig, data, title):
+    ax = fig.add_subplot()
+    ax.semilogy(data["snr_db"], data["ber"], marker="o", label="simulated")
+    if "ber_theory" in data:
+        ax.semilogy(data["snr_db"], data["ber_theory"], linestyle="--", color="gray", label="theory")
+        ax.legend()
+    ax.set_title(title)
+    ax.set_xlabel("SNR (dB)")
+    ax.set_ylabel("BER")
+    ax.grid(True, which="both")
+
+
+def _draw_ber_mimo(fig, data, title):
+    ax = fig.add_subplot()
+    for label, bers in data["ber"].items():
+        # partial results: a config may cover only the first SNR points
+        line, = ax.semilogy(data["snr_db"][:len(bers)], bers, marker="o", label=label)
+        if label in data.get("ber_theory", {}):
+            ax.semilogy(
+                data["snr_db"], data["ber_theory"][label], linestyle="--", color=line.get_color(),
+                label=f"{label} theory"
+            )
+    ax.set_title(title)
+    ax.set_xlabel("SNR (dB)")
+    ax.set_ylabel("BER")
+    ax.grid(True, which="both")
+    ax.legend()
+
+
+def _draw_radio_map(fig, data, title, tx_positions, legend=False):
+    ax = fig.add_subplot()
+    im = ax.imshow(data["power_dbm"], origin="lower", extent=data["extent"])
+    fig.colorbar(im, ax=ax, label="Received Power (dBm)")
+    for i, (tx_x, tx_y, _) in enumerate(tx_positions):
+        ax.scatter([tx_x], [tx_y], c="red", marker="^", label="TX" if i == 0 else None)
+    ax.set_title(title)
+    ax.set_xlabel("X (m)")
+    ax.set_ylabel("Y (m)")
+    if legend:
+        ax.legend()
+
+
+def _draw_constellation(fig, data, title):
+    ax = fig.add_subplot()
+    y = data["symbols"]
+    ax.scatter(y.real, y.imag, s=6, alpha=0.6)
+    ax.set_title(title)
+    ax.set_xlabel("In-phase")
+    ax.set_ylabel("Quadrature")
+    ax.grid(True)
+
+
+RENDERERS = {
+    "ber": (_draw_ber, None),
+    "ber_mimo": (_draw_ber_mimo, None),
+    "radio_map": (_draw_radio_map, None),
+    "constellation": (_draw_constellation, (5, 5)),
+}
+
+
+def render_png(kind, path, data, **style):
+    """Draws one figure and saves it atomically (tmp file + replace)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    draw, figsize = RENDERERS[kind]
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    draw(fig, data, **style)
+
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    fig.savefig(tmp, format="png", bbox_inches="tight")
+    os.replace(tmp, path)
+    return path
+
+
+class RenderPool:
+    """Thread pool for background renders; tracks in-flight paths."""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = None
+        self._pending = {}          # path -> Future
+        self._lock = threading.Lock()
+
+    def submit(self, kind, path, data, **style):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="render")
+            fut = self._executor.submit(render_png, kind, path, data, **style)
+            self._pending[path] = fut
+        fut.add_done_callback(lambda f, p=path: self._done(p, f))
+        return fut
+
+    def is_pending(self, path) -> bool:
+        with self._lock:
+            return path in self._pending
+
+    def wait(self, paths, timeout=None):
+        """Blocks until the given paths are rendered. Returns the ones that exist."""
+        with self._lock:
+            futs = [self._pending[p] for p in paths if p in self._pending]
+        if futs:
+            wait(futs, timeout=timeout)
+        return [p for p in paths if os.path.exists(p)]
+
+    def _done(self, path, fut):
+        with self._lock:
+            if self._pending.get(path) is fut:
+                del self._pending[path]
+        if fut.exception() is not None:
+            logger.error(f"Background render of {path} failed: {fut.exception()}")
+
+
+POOL = RenderPool()
+
+
+def render(kind, path, data, mode="sync", **style):
+    """Renders according to `mode`; returns the plot paths for the payload."""
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {mode} (expected one of {RENDER_MODES})")
+    if mode == "none":
+        return []
+    if mode == "background":
+        POOL.submit(kind, path, data, **style)
+        return [path]
+    return [render_png(kind, path, data, **style)]
+
+
+def wait_for(paths, timeout=None):
+    return POOL.wait(list(paths or []), timeout=timeout)
+
+
+def is_pending(path) -> bool:
+    return POOL.is_pending(path)
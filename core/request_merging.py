@@ -0,0 +1,145 @@
+"""
+Request merging for batched execution (TelecomMultiAgentAssistant.chat_many).
+
+Tasks for the same tool whose parameters differ only in one mergeable field
+run as a single tool call:
+  - simulate_ber: same everything but snr_db_list -> one sweep over the
+    union of the SNR points (each point's counts don't depend on the others)
+  - simulate_radio_map: same grid / radio params but tx_pos -> one stacked
+    [N, G, G] pass via simulate_radio_maps
+
+split() turns the merged payload back into one payload per task, shaped like
+the single-task tool's. bits_simulated is recounted per member from the
+points' newly simulated bits (bits_new; bits include stored counts); other
+scalar KPIs (batch_size, seed, ...) describe the shared run. Everything
+else runs one call per task.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+
+from core.render import plot_path, render as render_plot
+from core.result_cache import canonicalize
+
+# tool -> (field that is merged, tool that runs the merged call)
+MERGEABLE = {
+    "simulate_ber": ("snr_db_list", "simulate_ber"),
+    "simulate_radio_map": ("tx_pos", "simulate_radio_maps"),
+}
+DEFAULT_SNR_DB_LIST = [-5, 0, 5, 10, 15]
+DEFAULT_TX_POS = (0, 0, 10)
+BER_POINT_KPIS = ("snr_db", "ber", "errors", "bits", "bits_new", "ber_ci")
+
+
+@dataclass
+class MergedCall:
+    tool_name: str                       # tool actually called
+    params: Dict[str, Any]
+    members: List[int] = field(default_factory=list)     # indices into plan()'s items
+    source_tool: str = ""                # tool the members asked for
+
+    @property
+    def merged(self) -> bool:
+        return self.tool_name != self.source_tool or len(self.members) > 1
+
+
+def _group_key(tool_name, params, merge_field):
+    rest = {k: v for k, v in params.items() if k != merge_field}
+    return tool_name, repr(canonicalize(rest))
+
+
+def plan(items) -> List[MergedCall]:
+    """
+    items: [(tool_name, params)]
+    Returns one MergedCall per tool call to make, in order of first member.
+    """
+    calls = []
+    groups = {}
+    for i, (tool_name, params) in enumerate(items):
+        params = params or {}
+        if tool_name not in MERGEABLE:
+            calls.append(MergedCall(tool_name, params, [i], tool_name))
+            continue
+        key = _group_key(tool_name, params, MERGEABLE[tool_name][0])
+        if key not in groups:
+            groups[key] = MergedCall(tool_name, params, [], tool_name)
+            calls.append(groups[key])
+        groups[key].members.append(i)
+
+    for call in calls:
+        if len(call.members) > 1:
+            _, call.tool_name = MERGEABLE[call.source_tool]
+            call.params = _MERGE[call.source_tool]([items[i][1] for i in call.members])
+    return calls
+
+
+def split(call: MergedCall, payload: dict, items) -> list:
+    """Per-member payloads (in call.members order) from the merged call's payload."""
+    if not call.merged:
+        return [payload]
+    if payload.get("error"):
+        return [dict(payload) for _ in call.members]
+    return [_SPLIT[call.source_tool](payload, items[i][1] or {}, j) for j, i in enumerate(call.members)]
+
+
+# ---- simulate_ber: union SNR sweep ----
+def _merge_ber(params_list):
+    snrs = {}
+    for params in params_list:
+        for s in params.get("snr_db_list") or DEFAULT_SNR_DB_LIST:
+            snrs.setdefault(float(s), s)
+    # Each member gets its own plot in split(); the union curve isn't drawn
+    return dict(params_list[0], snr_db_list=[snrs[s] for s in sorted(snrs)], render="none")
+
+
+def _split_ber(payload, params, slot):
+    kpis = payload["kpis"]
+    snr_db_list = params.get("snr_db_list") or DEFAULT_SNR_DB_LIST
+    pos = {float(s): i for i, s in enumerate(kpis["snr_db"])}
+    idx = [pos[float(s)] for s in snr_db_list]
+
+    out = dict(kpis)
+    for name in BER_POINT_KPIS:
+        out[name] = [kpis[name][i] for i in idx]
+    if kpis.get("ber_theory") is not None:
+        out["ber_theory"] = [kpis["ber_theory"][i] for i in idx]
+    # Run-wide totals describe the union sweep: recount them for this member's points
+    out["bits_simulated"] = sum(out["bits_new"])
+    data = {name: np.asarray(values)[idx] for name, values in payload["data"].items()}
+
+    mod, channel = kpis["modulation"], kpis["channel"]
+    path = plot_path(params.get("out_dir", "outputs"), f"ber_{mod.lower()}_{channel}", [
+        "merged", canonicalize(params)
+    ])
+    plots = render_plot(
+        "ber", path, data, mode=params.get("render", "sync"),
+        title=f"BER vs SNR ({mod.upper()} - {channel.upper()})"
+    )
+    return {"plots": plots, "kpis": out, "data": data}
+
+
+# ---- simulate_radio_map: stacked single-TX maps ----
+def _merge_radio_map(params_list):
+    merged = {k: v for k, v in params_list[0].items() if k != "tx_pos"}
+    merged["tx_positions"] = [p.get("tx_pos", DEFAULT_TX_POS) for p in params_list]
+    return merged
+
+
+def _split_radio_map(payload, params, slot):
+    kpis = payload["kpis"]
+    plots = payload["plots"]
+    return {
+        "plots": plots[slot:slot + 1] if len(plots) == len(kpis["tx_positions"]) else [],
+        "kpis": {
+            "tx_pos": params.get("tx_pos", DEFAULT_TX_POS),
+            "rx_grid_size": kpis["rx_grid_size"],
+            "area_size": kpis["area_size"],
+            "frequency_hz": kpis["frequency_hz"]
+        },
+        "data": {"power_dbm": payload["data"]["power_dbm"][slot], "extent": payload["data"]["extent"]},
+    }
+
+
+_MERGE = {"simulate_ber": _merge_ber, "simulate_radio_map": _merge_radio_map}
+_SPLIT = {"simulate_ber": _split_ber, "simulate_radio_map": _split_radio_map}
@@ -0,0 +1,322 @@
+"""
+Content-addressed result cache for simulation tools.
+
+Key = sha256(tool name + tool version + canonicalized parameters + seed).
+A tool's version (TOOL_VERSIONS) is bumped whenever its output for the same
+parameters changes, so payloads computed by the old code (in particular from
+the persistent disk tier) stop being served.
+Two tiers:
+  - memory: LRU of payload dicts, bounded by entry count and by the bytes of
+            their in-memory arrays (payload "data" can be tens of MB)
+  - disk:   one pickle per key under cache_dir, LRU-evicted by last use
+            once the directory exceeds max_disk_bytes
+
+A hit returns the stored KPIs and plot paths without calling the tool
+(so no TensorFlow import). Hits whose plot files were deleted count as misses;
+plots still being rendered in the background count as present.
+
+Arrays memory-mapped from a .npy file (e.g. simulate_multi_radio_map's
+out_npy) are stored by reference: shared in memory, pickled as their path
+and reopened read-only on load. The file's identity (inode, size, mtime) is
+recorded at put(); once a later run rewrites that path, hits on the old entry
+become misses in both tiers.
+"""
+import copy
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def canonicalize(value):
+    """
+    Normalizes params so equivalent requests hash the same:
+    dict keys sorted, tuples -> lists, ints/floats/NumPy scalars -> float.
+    (NumPy values are detected via .tolist() so importing this stays cheap.)
+    """
+    if hasattr(value, "tolist") and not isinstance(value, (dict, list, tuple, str)):
+        value = value.tolist()
+    if isinstance(value, dict):
+        return {str(k): canonicalize(value[k]) for k in sorted(value, key=str)}
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+def _mapped_file(value):
+    """Path of a whole-file .npy memmap (not a view of one), else None."""
+    if type(value).__name__ != "memmap" or not isinstance(value.base, mmap.mmap):
+        return None
+    path = getattr(value, "filename", None)
+    return path if path and path.endswith(".npy") and os.path.exists(path) else None
+
+
+def _copy_payload(payload):
+    # Deep copy, except file-backed arrays, which are shared
+    data = payload.get("data") if isinstance(payload, dict) else None
+    memo = {}
+    if isinstance(data, dict):
+        memo = {id(v): v for v in data.values() if _mapped_file(v)}
+    return copy.deepcopy(payload, memo)
+
+
+def _file_id(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _payload_files(payload):
+    """{path: file id} of the file-backed arrays in a payload's data."""
+    data = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(data, dict):
+        return {}
+    paths = {_mapped_file(v) for v in data.values()} - {None}
+    return {path: _file_id(path) for path in paths}
+
+
+def _files_unchanged(files):
+    return all(_file_id(path) == file_id for path, file_id in files.items())
+
+
+class StaleFileError(OSError):
+    """A cached payload's backing .npy was rewritten or removed."""
+
+
+def _load_mapped(path, file_id=None):
+    import numpy as np
+    if file_id is not None and _file_id(path) != tuple(file_id):
+        raise StaleFileError(path)
+    return np.load(path, mmap_mode="r")
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, f, files, **kwargs):
+        super().__init__(f, **kwargs)
+        self.files = files
+
+    def reducer_override(self, obj):
+        path = _mapped_file(obj)
+        if path is None:
+            return NotImplemented
+        return _load_mapped, (path, self.files.get(path))
+
+
+def _payload_nbytes(value):
+    """Bytes of the in-memory arrays in a payload (file-backed memmaps count as 0)."""
+    if isinstance(value, dict):
+        return sum(_payload_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_payload_nbytes(v) for v in value)
+    if hasattr(value, "nbytes") and not _mapped_file(value):
+        return int(value.nbytes)
+    return 0
+
+
+# Bump a tool's entry whenever the same params start producing different results
+TOOL_VERSIONS = {
+    "simulate_ber_mimo": "mrc_v2",    # tools.simulate_ber_mimo.LINK_MODEL (MRC fix)
+}
+
+
+def make_key(tool_name: str, params: dict) -> str:
+    params = dict(params or {})
+    seed = params.pop("seed", None)
+    blob = json.dumps(
+        {"tool": tool_name, "version": TOOL_VERSIONS.get(tool_name), "params": canonicalize(params),
+         "seed": canonicalize(seed)},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=repr,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        cache_dir="outputs/cache",
+        max_memory_entries=64,
+        max_memory_bytes=256 * 1024 * 1024,
+        max_disk_bytes=256 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()          # key -> payload
+        self._memory_sizes = {}               # key -> array bytes of the payload
+        self._memory_files = {}               # key -> {path: file id} of its file-backed arrays
+        self._memory_bytes = 0
+        self._disk = OrderedDict()            # key -> file size (oldest first)
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+
+    def get(self, tool_name: str, params: dict):
+        key = make_key(tool_name, params)
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None and self._plots_exist(payload) and _files_unchanged(self._memory_files[key]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return _copy_payload(payload)
+            if payload is not None:
+                self._drop(key)
+
+            payload = self._disk_get(key)
+            if payload is not None and self._plots_exist(payload):
+                self._memory_put(key, payload, _payload_files(payload))
+                self.hits += 1
+                self.disk_hits += 1
+                return _copy_payload(payload)
+            if payload is not None:
+                self._drop(key)
+
+            self.misses += 1
+            return None
+
+    def put(self, tool_name: str, params: dict, payload: dict):
+        if not isinstance(payload, dict) or payload.get("error"):
+            return
+        key = make_key(tool_name, params)
+        payload = _copy_payload(payload)
+        files = _payload_files(payload)
+        with self._lock:
+            self._memory_put(key, payload, files)
+            self._disk_put(key, payload, files)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._disk):
+                self._remove_file(key)
+            self._memory.clear()
+            self._memory_sizes.clear()
+            self._memory_files.clear()
+            self._memory_bytes = 0
+            self._disk.clear()
+            self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # -------------------------
+    # HELPERS
+    # -------------------------
+
+    def _plots_exist(self, payload):
+        from core.render import is_pending
+        return all(os.path.exists(p) or is_pending(p) for p in payload.get("plots", []))
+
+    def _memory_put(self, key, payload, files):
+        size = _payload_nbytes(payload)
+        self._memory_pop(key)
+        if size > self.max_memory_bytes:
+            return                            # too big for memory: disk tier only
+        self._memory[key] = payload
+        self._memory_sizes[key] = size
+        self._memory_files[key] = files
+        self._memory_bytes += size
+        while len(self._memory) > self.max_memory_entries or self._memory_bytes > self.max_memory_bytes:
+            self._memory_pop(next(iter(self._memory)))
+
+    def _memory_pop(self, key):
+        if self._memory.pop(key, None) is not None:
+            self._memory_bytes -= self._memory_sizes.pop(key)
+            del self._memory_files[key]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load_disk_index(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _disk_get(self, key):
+        if not self.cache_dir or key not in self._disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+            os.utime(path)                    # mtime doubles as last-used time
+        except Exception:
+            self._drop(key)
+            return None
+        self._disk.move_to_end(key)
+        return payload
+
+    def _disk_put(self, key, payload, files):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            _Pickler(f, files, protocol=pickle.HIGHEST_PROTOCOL).dump(payload)
+        os.replace(tmp, path)
+
+        self._disk_bytes -= self._disk.pop(key, 0)
+        size = os.path.getsize(path)
+        self._disk[key] = size
+        self._disk_bytes += size
+
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+            old_key, _ = next(iter(self._disk.items()))
+            self._drop(old_key)
+            self.evictions += 1
+
+    def _drop(self, key):
+        self._memory_pop(key)
+        if key in self._disk:
+            self._disk_bytes -= self._disk.pop(key)
+            self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
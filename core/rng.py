@@ -0,0 +1,77 @@
+"""
+Counter-based, splittable random streams for the Monte Carlo tools.
+
+Every batch draws from its own Philox stream:
+  key     = hash(seed)                         (2 x 64 bit)
+  counter = [0, batch index, cell id (2 x 64 bit)]
+where the cell id hashes what defines a sweep point, e.g.
+("ber", k, fading, demapping, snr_db, batch_size). The stream of a batch
+depends on nothing but (seed, cell, batch index), so any shard of a sweep
+can run on any worker, in any order, and the merged counts are
+bit-identical to a serial run. Draws inside a batch advance counter[0]
+only, which never reaches the next batch's stream.
+
+TensorFlow ops can't take a NumPy Generator: tf_seed() derives stateless
+seed pairs from the same key material (one per independent draw of a
+batch), and the Sionna paths draw their channel noise / fading with
+tf_complex_normal() instead of the Sionna layers' internal generators. No
+global TF or Sionna seed is ever set, so concurrent runs (e.g. the
+assistant's thread pool) can't reseed each other mid-batch.
+"""
+import hashlib
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+
+
+def new_seed() -> int:
+    """Fresh 63-bit seed for seed=None runs (reported back so they can be replayed)."""
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0]) & (_MASK64 >> 1)
+
+
+def _digest(*parts) -> bytes:
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).digest()
+
+
+def cell_id(*parts) -> tuple:
+    """128-bit id of a sweep point as two uint64 words."""
+    return struct.unpack("<QQ", _digest(*parts))
+
+
+def batch_rng(seed, cell, batch) -> np.random.Generator:
+    """Philox Generator for batch `batch` of `cell` (from cell_id) under `seed`."""
+    key = struct.unpack("<QQ", _digest("seed", int(seed)))
+    bit_gen = np.random.Philox(key=np.array(key, dtype=np.uint64), counter=[0, int(batch) & _MASK64, *cell])
+    return np.random.Generator(bit_gen)
+
+
+def tf_seed(seed, cell, batch, draw=0) -> tuple:
+    """Stateless TF seed pair (two int32-range ints) for draw `draw` of the same batch."""
+    a, b = struct.unpack("<qq", _digest("tf", int(seed), tuple(cell), int(batch), int(draw)))
+    return a & 0x7FFFFFFF, b & 0x7FFFFFFF
+
+
+def tf_complex_normal(shape, seed, var=1.0):
+    """CN(0, var) complex64 draws from a tf_seed() pair; var broadcasts against shape."""
+    import tensorflow as tf
+    shape = tf.concat([[2], tf.cast(shape, tf.int32)], axis=0)
+    re_im = tf.random.stateless_normal(shape, seed, dtype=tf.float32)
+    scale = tf.sqrt(tf.cast(var, tf.float32) / 2.0)
+    return tf.complex(re_im[0] * scale, re_im[1] * scale)
+
+
+class Stream(NamedTuple):
+    """One batch's stream: what a count_batch() needs to draw reproducibly."""
+    seed: int
+    cell: tuple
+    batch: int
+
+    def rng(self) -> np.random.Generator:
+        return batch_rng(self.seed, self.cell, self.batch)
+
+    def tf_seed(self, draw=0) -> tuple:
+        return tf_seed(self.seed, self.cell, self.batch, draw)
+
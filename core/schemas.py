@@ -13,3 +13,5 @@ class ToolResult:
     ok: bool
     payload: Dict[str, Any]              # could include paths to plots, arrays, metrics
     error: Optional[str] = None
+    timings: Dict[str, Any] = field(default_factory=dict)   # core.tracing summary, if enabled
+    status: Optional[int] = None         # HTTP status, when the MCP server answered
@@ -0,0 +1,227 @@
+"""
+Async serving layer for concurrent front-end sessions.
+
+Prompts are parsed on the event loop (cheap). Each job then goes to a
+bounded queue for its tool's lane:
+  - "light": analytical radio maps, constellations
+  - "heavy": BER / MIMO Monte Carlo sweeps
+Every lane has its own worker coroutines, so its concurrency is set
+independently, and the simulation runs in a thread pool. A radio map
+therefore never waits behind a long MIMO sweep. History is kept per
+session id (core.session_store, optionally logged to SQLite), and queue
+depth / latency metrics are available via metrics().
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.simulation_agent import TASK_TO_TOOL
+from core.session_store import SessionStore, SessionView
+from core.tracing import trace, span
+
+TOOL_LANES = {
+    "simulate_constellation": "light",
+    "simulate_radio_map": "light",
+    "simulate_multi_radio_map": "light",
+    "simulate_ber": "heavy",
+    "simulate_ber_mimo": "heavy",
+}
+
+DEFAULT_CONCURRENCY = {"light": 4, "heavy": 2}
+
+
+class ServerBusy(Exception):
+    """Raised when a lane's job queue is full."""
+
+
+class _Lane:
+    def __init__(self, name, concurrency, max_queue):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.workers = []
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_s = deque(maxlen=500)
+        self.run_s = deque(maxlen=500)
+
+
+class AssistantServer:
+    def __init__(
+        self,
+        assistant,
+        concurrency=None,           # {"light": n, "heavy": n}
+        max_queue=32,               # per lane
+        lanes=None,                 # tool name -> lane override
+        session_maxlen=5,
+        session_log=None,           # SQLite file: session history survives restarts
+        max_sessions=10000,         # sessions kept in memory (LRU / idle eviction)
+    ):
+        self.assistant = assistant
+        self.concurrency = dict(DEFAULT_CONCURRENCY, **(concurrency or {}))
+        self.lanes_by_tool = dict(TOOL_LANES, **(lanes or {}))
+        self.max_queue = max_queue
+        self.session_maxlen = session_maxlen
+
+        self.sessions = SessionStore(maxlen=session_maxlen, path=session_log, max_sessions=max_sessions)
+        self._lanes = {}
+        self._loop = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(self.concurrency.values()), thread_name_prefix="sim"
+        )
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+
+    async def submit(self, session_id: str, prompt: str):
+        """Runs one prompt for a session. Returns (summary, payload)."""
+        self._ensure_started()
+
+        fut = self._enqueue(self._parse(prompt))
+        task, result = await fut
+        return self._finish(session_id, prompt, task, result)
+
+    async def submit_stream(self, session_id: str, prompt: str):
+        """
+        Like submit(), but an async iterator of (summary, payload): one per
+        partial result, then the final pair.
+        """
+        self._ensure_started()
+
+        updates = asyncio.Queue()
+        fut = self._enqueue(self._parse(prompt), updates)
+        while True:
+            item = await updates.get()
+            if item is None:          # job finished (or failed): fut holds the outcome
+                break
+            task, result = item
+            yield self.assistant.summarizer.run(task, result), result.payload
+
+        task, result = await fut
+        yield self._finish(session_id, prompt, task, result)
+
+    def session(self, session_id: str) -> SessionView:
+        return self.sessions.session(session_id)
+
+    def metrics(self) -> dict:
+        out = {"sessions": len(self.sessions), "session_store": self.sessions.stats(), "lanes": {}}
+        for name, lane in self._lanes.items():
+            out["lanes"][name] = {
+                "concurrency": lane.concurrency,
+                "queue_depth": lane.queue.qsize(),
+                "running": lane.running,
+                "completed": lane.completed,
+                "failed": lane.failed,
+                "rejected": lane.rejected,
+                "wait_ms": _percentiles(lane.wait_s),
+                "run_ms": _percentiles(lane.run_s),
+            }
+        return out
+
+    async def shutdown(self):
+        for lane in self._lanes.values():
+            for w in lane.workers:
+                w.cancel()
+        self._executor.shutdown(wait=False)
+        self.sessions.close()
+
+    # -------------------------
+    # HELPERS
+    # -------------------------
+
+    def _parse(self, prompt):
+        task = self.assistant.interpreter.run(prompt)
+        return self.assistant.extractor.run(task)
+
+    def _enqueue(self, task, updates=None):
+        tool_name = TASK_TO_TOOL.get(task.task_type)
+        lane = self._lanes[self.lanes_by_tool.get(tool_name, "heavy")]
+
+        fut = self._loop.create_future()
+        try:
+            lane.queue.put_nowait((task, time.perf_counter(), fut, updates))
+        except asyncio.QueueFull:
+            lane.rejected += 1
+            raise ServerBusy(f"{lane.name} queue full ({self.max_queue} jobs)")
+        return fut
+
+    def _finish(self, session_id, prompt, task, result):
+        summary = self.assistant.summarizer.run(task, result)
+        self.session(session_id).add({
+            "prompt": prompt,
+            "task_type": task.task_type,
+            "params": task.parameters,
+            "tool": task.tool_name,
+            "result_ok": result.ok
+        })
+        return summary, result.payload if result.ok else {}
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._lanes = {
+            name: _Lane(name, n, self.max_queue) for name, n in self.concurrency.items()
+        }
+        for lane in self._lanes.values():
+            lane.workers = [loop.create_task(self._worker(lane)) for _ in range(lane.concurrency)]
+
+    async def _worker(self, lane):
+        while True:
+            task, t_enq, fut, updates = await lane.queue.get()
+            t_start = time.perf_counter()
+            lane.wait_s.append(t_start - t_enq)
+            lane.running += 1
+            try:
+                if updates is None:
+                    res = await self._loop.run_in_executor(self._executor, self._simulate, task)
+                else:
+                    push = lambda item: self._loop.call_soon_threadsafe(updates.put_nowait, item)
+                    res = await self._loop.run_in_executor(
+                        self._executor, self._simulate_stream, task, push
+                    )
+                if not fut.done():
+                    fut.set_result(res)
+                lane.completed += 1
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+                lane.failed += 1
+            finally:
+                if updates is not None:
+                    updates.put_nowait(None)
+                lane.running -= 1
+                lane.run_s.append(time.perf_counter() - t_start)
+                lane.queue.task_done()
+
+    def _simulate(self, task):
+        # Runs in a pool thread: traced separately from the event loop's context
+        with trace(enabled=getattr(self.assistant, "tracing", False)) as tr:
+            with span("simulate"):
+                task, result = self.assistant.simulator.run(task)
+        if tr is not None:
+            result.timings = tr.summary()
+        return task, result
+
+    def _simulate_stream(self, task, push):
+        # Pool thread: forwards partial results to the event loop, returns the final one
+        final = None
+        for task, result in self.assistant.simulator.run_stream(task):
+            if result.ok and result.payload.get("partial"):
+                push((task, result))
+            else:
+                final = (task, result)
+        return final
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1e3
+    return {"p50": pick(0.50), "p95": pick(0.95), "max": s[-1] * 1e3}
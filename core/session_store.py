@@ -1,18 +1,209 @@
-from collections import deque
+"""
+Per-session interaction history for the assistant and the serving layer.
+
+Two tiers:
+  - hot:  session id -> deque of its last `maxlen` records, kept in an LRU
+          (OrderedDict by last use). Sessions idle for more than idle_ttl_s,
+          or beyond max_sessions, drop out of memory, least recently used first.
+          Each session has its own deque, so a busy session can't push out
+          another session's history.
+  - disk: optional append-only SQLite log (path=...), clustered by
+          (session_id, seq). An append is one indexed insert. An evicted
+          session, or any session after a restart, reloads its last `maxlen`
+          records with one range query, so nothing is replayed at startup.
+
+Without a path, evicted sessions are gone (memory-only, as before).
+add / last / all without a session id use the default session, so
+SessionStore(maxlen=5) still works as a plain "last K interactions" memory.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+DEFAULT_SESSION = "default"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID
+"""
+
+
+class _Session:
+    __slots__ = ("history", "next_seq", "last_used")
+
+    def __init__(self, maxlen, history=(), next_seq=0):
+        self.history = deque(history, maxlen=maxlen)
+        self.next_seq = next_seq
+        self.last_used = time.monotonic()
 
-class SessionStore:
-    """
-    Minimal memory: keeps last K interactions.
-    Enough to claim 'Sessions & state management'.
-    """
-    def __init__(self, maxlen=5):
-        self.history = deque(maxlen=maxlen)
+
+class SessionView:
+    """add / last / all bound to one session id (what a per-session SessionStore used to be)."""
+
+    def __init__(self, store, session_id):
+        self.store = store
+        self.session_id = session_id
 
     def add(self, record: dict):
-        self.history.append(record)
+        self.store.add(record, session_id=self.session_id)
 
     def last(self):
-        return self.history[-1] if self.history else None
+        return self.store.last(session_id=self.session_id)
 
     def all(self):
-        return list(self.history)
+        return self.store.all(session_id=self.session_id)
+
+
+class SessionStore:
+    def __init__(
+        self,
+        maxlen=5,                   # records kept in memory per session
+        path=None,                  # SQLite log file; None = memory only
+        max_sessions=10000,         # sessions kept in memory
+        idle_ttl_s=3600.0,          # evict sessions idle this long (None = never)
+    ):
+        self.maxlen = maxlen
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+
+        self._hot = OrderedDict()           # session_id -> _Session, least recently used first
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(_SCHEMA)
+
+    # -------------------------
+    # PUBLIC API
+    # -------------------------
+
+    def add(self, record: dict, session_id=None):
+        session_id = session_id or DEFAULT_SESSION
+        with self._lock:
+            s = self._get(session_id)
+            s.history.append(record)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO records (session_id, seq, ts, record) VALUES (?, ?, ?, ?)",
+                    (session_id, s.next_seq, time.time(), json.dumps(record, default=repr)),
+                )
+            s.next_seq += 1
+
+    def last(self, session_id=None):
+        with self._lock:
+            s = self._get(session_id or DEFAULT_SESSION)
+            return s.history[-1] if s.history else None
+
+    def all(self, session_id=None):
+        """The session's last `maxlen` records, oldest first."""
+        with self._lock:
+            return list(self._get(session_id or DEFAULT_SESSION).history)
+
+    def history(self, session_id=None, limit=None):
+        """Full logged history of a session (oldest first); the hot tier without a log."""
+        session_id = session_id or DEFAULT_SESSION
+        if self._db is None:
+            return self.all(session_id)[-limit:] if limit else self.all(session_id)
+        with self._lock:
+            return self._load_records(session_id, limit)
+
+    def session(self, session_id) -> SessionView:
+        return SessionView(self, session_id)
+
+    def session_ids(self):
+        """Every session id: logged ones, plus those only in memory."""
+        with self._lock:
+            ids = set(self._hot)
+            if self._db is not None:
+                ids.update(r[0] for r in self._db.execute("SELECT DISTINCT session_id FROM records"))
+        return sorted(ids)
+
+    def evict_idle(self):
+        """Drops idle / excess sessions from memory. Returns how many were evicted."""
+        with self._lock:
+            return self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hot_sessions": len(self._hot),
+                "hot_records": sum(len(s.history) for s in self._hot.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "durable": self._db is not None,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return len(self._hot)
+
+    # -------------------------
+    # HELPERS (lock held)
+    # -------------------------
+
+    def _get(self, session_id):
+        s = self._hot.get(session_id)
+        if s is None:
+            s = self._load(session_id)
+            self._hot[session_id] = s
+        else:
+            self._hot.move_to_end(session_id)
+        s.last_used = time.monotonic()
+        self._evict()
+        return s
+
+    def _load(self, session_id):
+        if self._db is None:
+            return _Session(self.maxlen)
+        self.loads += 1
+        row = self._db.execute(
+            "SELECT MAX(seq) FROM records WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        next_seq = 0 if row[0] is None else row[0] + 1
+        return _Session(self.maxlen, self._load_records(session_id, self.maxlen), next_seq)
+
+    def _load_records(self, session_id, limit=None):
+        if limit:
+            rows = self._db.execute(
+                "SELECT record FROM records WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()[::-1]
+        else:
+            rows = self._db.execute(
+                "SELECT record FROM records WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def _evict(self):
+        # Oldest-used sessions sit at the front: stop at the first one still wanted
+        n = 0
+        now = time.monotonic()
+        while self._hot:
+            session_id, s = next(iter(self._hot.items()))
+            idle = self.idle_ttl_s is not None and now - s.last_used > self.idle_ttl_s
+            if not idle and len(self._hot) <= self.max_sessions:
+                break
+            del self._hot[session_id]
+            n += 1
+        self.evictions += n
+        return n
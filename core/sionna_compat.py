@@ -17,3 +17,21 @@ def phy_imports():
     from sionna.channel import AWGN, FlatFadingChannel
     from sionna.utils import ebnodb2no
     return Constellation, Mapper, Demapper, AWGN, FlatFadingChannel, ebnodb2no
+
+
+def resolve_backend(backend="sionna"):
+    """
+    "sionna" | "numpy" | "auto".
+    "auto" picks Sionna when TensorFlow + Sionna import, else the NumPy PHY.
+    """
+    backend = (backend or "sionna").lower()
+    if backend not in ("sionna", "numpy", "auto"):
+        raise ValueError(f"Unknown backend: {backend} (use sionna, numpy or auto)")
+    if backend != "auto":
+        return backend
+    try:
+        import tensorflow  # noqa: F401
+        phy_imports()
+        return "sionna"
+    except Exception:
+        return "numpy"
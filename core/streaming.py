@@ -0,0 +1,47 @@
+"""
+Streaming execution helpers.
+
+A streaming tool is a generator `iter_<tool>(**params)` that yields payloads.
+Partial payloads have the usual {"plots", "kpis", "data"} shape plus
+  "partial": True, "progress": {"done": i, "total": n, "unit": "snr point" | ...}
+and the last payload yielded is the final result, the same one the blocking
+tool returns. Blocking tools are built from the generator with
+run_to_completion(), so both entry points share one implementation.
+"""
+import functools
+
+
+def drain(gen):
+    """Consumes a streaming tool and returns its final payload."""
+    last = None
+    for last in gen:
+        pass
+    return last
+
+
+def as_partial(payload, done, total, unit):
+    payload["partial"] = True
+    payload["progress"] = {"done": done, "total": total, "unit": unit}
+    return payload
+
+
+def is_partial(payload) -> bool:
+    return bool(payload) and bool(payload.get("partial"))
+
+
+def run_to_completion(iter_fn, name):
+    """Blocking tool `name` with iter_fn's signature and docstring."""
+    @functools.wraps(iter_fn)
+    def tool(*args, **kwargs):
+        return drain(iter_fn(*args, **kwargs))
+
+    tool.__name__ = tool.__qualname__ = name
+    return tool
+
+
+def single_shot(tool_fn):
+    """Adapts a non-streaming tool to the streaming interface (one final yield)."""
+    def stream(**params):
+        params.pop("preview", None)
+        yield tool_fn(**params)
+    return stream
@@ -0,0 +1,166 @@
+"""
+Lightweight stage-level latency tracing.
+
+    with trace() as tr:                 # activates a Tracer for this context
+        with span("simulate"):
+            with span("mapper"): ...
+    tr.summary()  -> {"simulate": {...}, "simulate/mapper": {...}}
+
+Spans nest by name into slash-separated paths and are aggregated per path
+(count + total time), so per-batch spans inside Monte Carlo loops stay cheap.
+When no tracer is active, span() returns a shared no-op context manager:
+the disabled cost is one ContextVar lookup.
+
+Finished traces can be exported as JSON lines or folded into METRICS for
+Prometheus-style text exposition.
+"""
+import contextlib
+import contextvars
+import json
+import threading
+import time
+import uuid
+
+_ACTIVE = contextvars.ContextVar("telecom_tracer", default=None)
+_NOOP = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "t0")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        tr = self.tracer
+        tr._stack.append(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        tr = self.tracer
+        path = "/".join(tr._stack)
+        tr._stack.pop()
+        stat = tr.stages.get(path)
+        if stat is None:
+            tr.stages[path] = [1, dt]
+        else:
+            stat[0] += 1
+            stat[1] += dt
+        return False
+
+
+class Tracer:
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.stages = {}          # path -> [count, total_s], in first-seen order
+        self._stack = []
+        self.t_start = time.perf_counter()
+        self.wall_s = None
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def finish(self):
+        if self.wall_s is None:
+            self.wall_s = time.perf_counter() - self.t_start
+        return self
+
+    def summary(self) -> dict:
+        """JSON-friendly breakdown: {"trace_id", "wall_ms", "stages": {path: {count, total_ms}}}"""
+        wall = self.wall_s if self.wall_s is not None else time.perf_counter() - self.t_start
+        return {
+            "trace_id": self.trace_id,
+            "wall_ms": wall * 1e3,
+            "stages": {
+                path: {"count": c, "total_ms": t * 1e3} for path, (c, t) in self.stages.items()
+            },
+        }
+
+    def to_json_lines(self) -> str:
+        return "\n".join(
+            json.dumps({"trace_id": self.trace_id, "stage": path, "count": c, "total_ms": t * 1e3})
+            for path, (c, t) in self.stages.items()
+        )
+
+
+def span(name):
+    """Times a stage under the active tracer; no-op when tracing is off."""
+    tr = _ACTIVE.get()
+    if tr is None:
+        return _NOOP
+    return tr.span(name)
+
+
+def current():
+    return _ACTIVE.get()
+
+
+@contextlib.contextmanager
+def trace(enabled=True, trace_id=None):
+    """
+    Activates a Tracer for the enclosed block and yields it (None if disabled).
+    Nested trace() calls reuse the outer tracer.
+    """
+    outer = _ACTIVE.get()
+    if not enabled or outer is not None:
+        yield outer
+        return
+    tr = Tracer(trace_id)
+    token = _ACTIVE.set(tr)
+    try:
+        yield tr
+    finally:
+        _ACTIVE.reset(token)
+        tr.finish()
+        METRICS.add(tr)
+
+
+def export_jsonl(tracer, path):
+    """Appends a finished trace to a JSON-lines file."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(tracer.to_json_lines() + "\n")
+
+
+class StageMetrics:
+    """Process-wide cumulative per-stage counters across finished traces."""
+
+    def __init__(self, prefix="telecom_stage"):
+        self.prefix = prefix
+        self._stages = {}
+        self._traces = 0
+        self._lock = threading.Lock()
+
+    def add(self, tracer):
+        with self._lock:
+            self._traces += 1
+            for path, (c, t) in tracer.stages.items():
+                stat = self._stages.setdefault(path, [0, 0.0])
+                stat[0] += c
+                stat[1] += t
+
+    def to_prometheus(self) -> str:
+        p = self.prefix
+        with self._lock:
+            lines = [
+                f"# HELP {p}_seconds_total Cumulative time spent per pipeline stage.",
+                f"# TYPE {p}_seconds_total counter",
+            ]
+            lines += [f'{p}_seconds_total{{stage="{s}"}} {t:.6f}' for s, (_, t) in self._stages.items()]
+            lines += [
+                f"# HELP {p}_calls_total Number of times each pipeline stage ran.",
+                f"# TYPE {p}_calls_total counter",
+            ]
+            lines += [f'{p}_calls_total{{stage="{s}"}} {c}' for s, (c, _) in self._stages.items()]
+            lines += [f"# TYPE {p}_traces_total counter", f"{p}_traces_total {self._traces}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._traces = 0
+
+
+METRICS = StageMetrics()
@@ -0,0 +1,211 @@
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+
+from core.local_tools import LOCAL_TOOL_REGISTRY
+
+SNRS = [-5, 0, 5, 10, 15]
+
+
+def build_cases(profile="quick", backend="numpy"):
+    """
+    Parameter grids per tool. "quick" is CI-sized; "full" covers the
+    planning-scale ranges (2000x2000 maps, 50 TX, 1e7 bits, 8x8, 256-QAM).
+    Each case: {"name", "tool", "params", "work", "unit"}
+    """
+    full = profile == "full"
+    cases = []
+
+    for g in ([80, 250, 500, 1000, 2000] if full else [80, 250, 500]):
+        cases.append({
+            "name": f"radio_map/grid{g}",
+            "tool": "simulate_radio_map",
+            "params": {"rx_grid_size": g},
+            "work": g * g,
+            "unit": "pixels",
+        })
+
+    g = 1000 if full else 250
+    for n_tx in ([1, 5, 10, 25, 50] if full else [1, 5, 10]):
+        txs = [[-90 + 180 * i / max(1, n_tx - 1), 0.0, 10.0] for i in range(n_tx)]
+        for mode in ("max", "sum"):
+            cases.append({
+                "name": f"multi_radio_map/grid{g}/tx{n_tx}/{mode}",
+                "tool": "simulate_multi_radio_map",
+                "params": {"tx_positions": txs, "rx_grid_size": g, "combine_mode": mode},
+                "work": g * g * n_tx,
+                "unit": "pixels",
+            })
+
+    mods = ["qpsk", "16qam", "64qam", "256qam"]
+    for n_bits in ([10**4, 10**5, 10**6, 10**7] if full else [10**4, 10**5]):
+        for mod in (mods if full else ["qpsk", "16qam"]):
+            for channel in ("awgn", "rayleigh"):
+                cases.append({
+                    "name": f"ber/{mod}/{channel}/bits{n_bits}",
+                    "tool": "simulate_ber",
+                    "params": {"modulation": mod, "channel": channel, "snr_db_list": SNRS,
+                               "n_bits": n_bits, "backend": backend},
+                    "work": n_bits * len(SNRS),
+                    "unit": "bits",
+                })
+
+    n_bits = 10**6 if full else 3 * 10**4
+    for n in ([1, 2, 4, 8] if full else [1, 2, 4]):
+        for mod in (["16qam", "64qam", "256qam"] if full else ["16qam"]):
+            cases.append({
+                "name": f"ber_mimo/{mod}/{n}x{n}/bits{n_bits}",
+                "tool": "simulate_ber_mimo",
+                "params": {"modulation": mod, "snr_db_list": SNRS, "configs": [{"nt": n, "nr": n}],
+                           "n_bits": n_bits, "backend": backend},
+                "work": n_bits * len(SNRS),
+                "unit": "bits",
+            })
+
+    for mod in mods:
+        n_sym = 10**5 if full else 10**4
+        cases.append({
+            "name": f"constellation/{mod}/sym{n_sym}",
+            "tool": "simulate_constellation",
+            "params": {"modulation": mod, "n_symbols": n_sym, "backend": backend},
+            "work": n_sym,
+            "unit": "symbols",
+        })
+
+    return cases
+
+
+def run_case(case, out_dir, repeats=1, measure_memory=True, render="none"):
+    """Best-of-`repeats` wall time, throughput and (separate run) peak traced memory."""
+    fn = LOCAL_TOOL_REGISTRY[case["tool"]]
+    params = dict(case["params"], out_dir=out_dir, render=render)
+
+    walls = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        payload = fn(**params)
+        walls.append(time.perf_counter() - t0)
+        if payload.get("error"):
+            return {"name": case["name"], "error": payload["error"]}
+    wall = min(walls)
+
+    peak_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        fn(**params)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / 2**20
+
+    return {
+        "name": case["name"],
+        "tool": case["tool"],
+        "wall_s": wall,
+        "throughput": case["work"] / wall if wall > 0 else None,
+        "unit": f"{case['unit']}/s",
+        "peak_mb": peak_mb,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Flags cases slower (or hungrier) than baseline by more than `tolerance`."""
+    flagged = []
+    for r in results:
+        base = baseline.get(r["name"])
+        if base is None or "wall_s" not in r or "wall_s" not in base:
+            continue
+        ratio = r["wall_s"] / base["wall_s"] if base["wall_s"] else 1.0
+        if ratio > 1 + tolerance:
+            flagged.append((r["name"], "wall_s", base["wall_s"], r["wall_s"], ratio))
+        if r.get("peak_mb") and base.get("peak_mb"):
+            mratio = r["peak_mb"] / base["peak_mb"]
+            if mratio > 1 + tolerance:
+                flagged.append((r["name"], "peak_mb", base["peak_mb"], r["peak_mb"], mratio))
+    return flagged
+
+
+def run_bench(
+    profile="quick",
+    backend="numpy",
+    baseline_path="eval/bench_baseline.json",
+    update_baseline=False,
+    tolerance=0.25,
+    only=None,
+    repeats=1,
+    measure_memory=True,
+    render="none",
+):
+    cases = [c for c in build_cases(profile, backend) if not only or c["tool"] in only]
+    out_dir = tempfile.mkdtemp(prefix="bench_")
+
+    print(f"\n--- Running Benchmarks ({profile}, backend={backend}, render={render}, {len(cases)} cases) ---\n")
+    results = []
+    for case in cases:
+        r = run_case(case, out_dir, repeats, measure_memory, render)
+        results.append(r)
+        if "error" in r:
+            print(f"[{r['name']}] ERROR: {r['error']}")
+            continue
+        mem = f"{r['peak_mb']:9.1f} MB" if r["peak_mb"] is not None else "        -"
+        print(f"[{r['name']:45s}] {r['wall_s'] * 1e3:10.1f} ms  {r['throughput']:12.3e} {r['unit']:10s} {mem}")
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    flagged = compare(results, baseline, tolerance)
+    print("\n=== Regressions ===")
+    if not baseline:
+        print(f"No baseline at {baseline_path} (run with --update-baseline).")
+    elif not flagged:
+        print(f"None beyond {tolerance:.0%} tolerance.")
+    for name, metric, old, new, ratio in flagged:
+        print(f"REGRESSION {name}: {metric} {old:.4g} -> {new:.4g} ({ratio:.2f}x)")
+
+    if update_baseline:
+        merged = dict(baseline)
+        merged.update({r["name"]: r for r in results if "error" not in r})
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                            "cpus": os.cpu_count()},
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": merged,
+            }, f, indent=1)
+        print(f"\nBaseline written to {baseline_path}")
+
+    return results, flagged
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Tool performance benchmarks")
+    ap.add_argument("--profile", choices=["quick", "full"], default="quick")
+    ap.add_argument("--backend", default="numpy", help="sionna | numpy | auto")
+    ap.add_argument("--baseline", default="eval/bench_baseline.json")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    ap.add_argument("--only", nargs="*", help="tool names to run")
+    ap.add_argument("--repeats", type=int, default=1)
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--render", choices=["none", "sync"], default="none", help="include PNG rendering")
+    args = ap.parse_args()
+
+    _, flagged = run_bench(
+        profile=args.profile,
+        backend=args.backend,
+        baseline_path=args.baseline,
+        update_baseline=args.update_baseline,
+        tolerance=args.tolerance,
+        only=args.only,
+        repeats=args.repeats,
+        measure_memory=not args.no_memory,
+        render=args.render,
+    )
+    sys.exit(1 if flagged else 0)
@@ -1,6 +1,8 @@
 from core.task_decomposer import TaskDecomposer
 from core.mcp_client import MCPClient
 from core.session_store import SessionStore
+from core.result_cache import ResultCache
+from core.tracing import trace, span, export_jsonl
 
 from agents.interpreter_agent import InterpreterAgent
 from agents.parameter_extractor_agent import ParameterExtractorAgent
@@ -9,31 +11,112 @@ from agents.summary_agent import SummaryAgent
 
 
 class TelecomMultiAgentAssistant:
-    def __init__(self, mcp_url="http://localhost:8080"):
+    def __init__(
+        self,
+        mcp_url="http://localhost:8080",
+        cache_dir="outputs/cache",
+        ber_store="outputs/ber_store.json",   # BER / MIMO sweeps top up stored per-SNR counts (None: off)
+        warm_up_tools=None,
+        tracing=False,               # attach per-stage timings to ToolResult.timings
+        trace_log=None,              # optional JSON-lines file for finished traces
+        render="sync",               # plots: "sync" | "background" | "none" (KPIs/arrays only)
+        session_log=None             # SQLite file: keep chat history across restarts
+    ):
         self.decomposer = TaskDecomposer()
         self.mcp = MCPClient(mcp_url)
-        self.memory = SessionStore(maxlen=5)
+        self.memory = SessionStore(maxlen=5, path=session_log)
+        self.tracing = tracing
+        self.trace_log = trace_log
+        self.cache = ResultCache(cache_dir=cache_dir)
 
         self.interpreter = InterpreterAgent(self.decomposer)
         self.extractor = ParameterExtractorAgent(self.decomposer)
-        self.simulator = SimulationAgent(use_mcp=False)
+        self.simulator = SimulationAgent(use_mcp=False, cache=self.cache, render=render, ber_store=ber_store)
         self.summarizer = SummaryAgent()
 
-    def chat(self, prompt: str):
+        # Tools import lazily on first use; True / [tool names] pays that cost now
+        if warm_up_tools:
+            from core.local_tools import LOCAL_TOOL_REGISTRY
+            names = None if warm_up_tools is True else warm_up_tools
+            LOCAL_TOOL_REGISTRY.warm_up(names)
+
+    def chat(self, prompt: str, session_id=None):
+        """Returns (summary, payload); the turn is recorded under session_id (None: the default session)."""
+        with trace(enabled=self.tracing) as tr:
+            with span("interpret"):
+                task = self.interpreter.run(prompt)
+            with span("extract"):
+                task = self.extractor.run(task)
+            with span("simulate"):
+                task, result = self.simulator.run(task)
+            with span("summarize"):
+                summary = self.summarizer.run(task, result)
+
+        if tr is not None:
+            result.timings = tr.summary()
+            if self.trace_log:
+                export_jsonl(tr, self.trace_log)
+
+        self._remember(prompt, task, result, session_id)
+        return summary, result.payload if result.ok else {}
+
+    def chat_many(self, prompts, session_id=None):
+        """
+        Batched chat(): parses every prompt first, then runs the tasks with
+        compatible requests merged into one tool call (BER sweeps over the
+        union of SNR points, stacked single-TX radio maps; see
+        core.request_merging). Returns [(summary, payload)] in prompt order.
+        With tracing, every result carries the timings of the whole batch.
+        session_id: a single id for all prompts, or one per prompt.
+        """
+        prompts = list(prompts)
+        with trace(enabled=self.tracing) as tr:
+            with span("interpret"):
+                tasks = self.interpreter.run_many(prompts)
+            with span("extract"):
+                tasks = self.extractor.run_many(tasks)
+            with span("simulate"):
+                done = self.simulator.run_many(tasks)
+            with span("summarize"):
+                summaries = [self.summarizer.run(task, result) for task, result in done]
+
+        if tr is not None:
+            timings = tr.summary()
+            for _, result in done:
+                result.timings = timings
+            if self.trace_log:
+                export_jsonl(tr, self.trace_log)
+
+        session_ids = session_id if isinstance(session_id, (list, tuple)) else [session_id] * len(prompts)
+        out = []
+        for prompt, (task, result), summary, sid in zip(prompts, done, summaries, session_ids):
+            self._remember(prompt, task, result, sid)
+            out.append((summary, result.payload if result.ok else {}))
+        return out
+
+    def chat_stream(self, prompt: str, session_id=None):
+        """
+        Streaming chat(): yields (summary, payload) after every partial result
+        (SNR point, MIMO point, map tile), then the final pair, which is also
+        recorded in memory. Not traced: spans can't straddle the yields.
+        """
         task = self.interpreter.run(prompt)
         task = self.extractor.run(task)
-        task, result = self.simulator.run(task)
-        summary = self.summarizer.run(task, result)
 
+        for task, result in self.simulator.run_stream(task):
+            summary = self.summarizer.run(task, result)
+            if not (result.ok and result.payload.get("partial")):
+                self._remember(prompt, task, result, session_id)
+            yield summary, result.payload if result.ok else {}
+
+    def _remember(self, prompt, task, result, session_id=None):
         self.memory.add({
             "prompt": prompt,
             "task_type": task.task_type,
             "params": task.parameters,
             "tool": task.tool_name,
             "result_ok": result.ok
-        })
-
-        return summary, result.payload if result.ok else {}
+        }, session_id=session_id)
 
 
 if __name__ == "__main__":
@@ -1,98 +1,483 @@
+import logging
 import os
 import numpy as np
-import matplotlib.pyplot as plt
-from core.sionna_compat import phy_imports
+from core.sionna_compat import phy_imports, resolve_backend
+from core import numpy_phy
+from core.numpy_phy import bits_per_symbol
+from core.ber_store import open_store, point_key
+from core.ber_stats import StoppingRule, is_point_kpis, point_kpis
+from core.ber_theory import qam_ber_or_none
+from core.parallel_mc import first_batch, run_sharded
+from core.rng import Stream, cell_id, new_seed, tf_complex_normal, tf_seed
+from core.batching import (
+    BackoffCounter, MIN_BATCH, auto_batch_size, ber_bytes_per_symbol, is_oom, memory_budget_bytes
+)
+from core.tracing import span
+from core.render import plot_path, render as render_plot
+from core.streaming import as_partial, run_to_completion
 
-def simulate_ber(
+
+METHODS = ("mc", "is", "theory")
+SWEEPS = ("loop", "graph")
+
+logger = logging.getLogger("simulate_ber")
+
+
+def _cell(k, fading, demapping, snr_db, batch_size, method="mc"):
+    """Stream cell of one SNR point (core.rng); the backend is left out, so both draw the same bits."""
+    return cell_id("ber" if method == "mc" else f"ber_{method}", k, bool(fading), demapping, float(snr_db),
+                   int(batch_size))
+
+
+def _sionna_counter(k, fading, demapping, batch_size):
+    """
+    Eager Sionna pipeline. Returns: count_batch(no, stream) -> (n_err, n_bits), snr_to_no
+    Bits come from the batch's Philox stream, fading and noise from stateless
+    draws keyed by the same stream (core.rng), so no global TF seed is touched.
+    """
+    with span("setup"):
+        import tensorflow as tf
+        # Only need Mapper/Demapper/ebnodb2no: the channel is drawn statelessly below
+        _, Mapper, Demapper, _, _, ebnodb2no = phy_imports()
+
+        mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
+        demapper = Demapper(demapping, constellation_type="qam", num_bits_per_symbol=k)
+
+    def count_batch(no, stream):
+        with span("mapper"):
+            b = tf.constant(numpy_phy.random_bits(stream.rng(), batch_size, k), dtype=tf.int32)
+            x = mapper(b)
+
+        with span("channel"):
+            n = tf_complex_normal(tf.shape(x), stream.tf_seed(0), no)
+            if fading:
+                h = tf_complex_normal(tf.shape(x), stream.tf_seed(1))
+                # Zero-forcing equalization -> per-symbol effective noise
+                y = x + n / h
+                no_eff = no / tf.abs(h) ** 2
+            else:
+                y, no_eff = x + n, no
+
+        with span("demapper"):
+            try:
+                llr = demapper(y, no_eff)
+            except TypeError:
+                llr = demapper([y, no_eff])
+
+        with span("host_sync"):
+            b_hat = tf.cast(llr > 0, tf.int32)
+            n_err = tf.reduce_sum(tf.cast(tf.not_equal(b, b_hat), tf.int32)).numpy()
+        return int(n_err), batch_size * k
+
+    return count_batch, lambda snr_db: ebnodb2no(snr_db, k, coderate=1.0)
+
+
+def _numpy_counter(k, fading, demapping, batch_size):
+    """Same link in pure NumPy (core.numpy_phy), no TensorFlow."""
+
+    def count_batch(no, stream):
+        rng = stream.rng()
+        with span("mapper"):
+            b = numpy_phy.random_bits(rng, batch_size, k)
+            x = numpy_phy.map_bits(b, k)
+        with span("channel"):
+            if fading:
+                y, h = numpy_phy.rayleigh_flat(rng, x, no)
+            else:
+                y, h = numpy_phy.awgn(rng, x, no), None
+        with span("demapper"):
+            llr = numpy_phy.demap_llr(y, no, k, h=h, method=demapping)
+            n_err = np.count_nonzero((llr > 0) != b)
+        return int(n_err), batch_size * k
+
+    return count_batch, lambda snr_db: float(numpy_phy.ebnodb2no(snr_db, k))
+
+
+def _numpy_is_counter(k, fading, demapping, batch_size):
+    """
+    Importance-sampling link (numpy_phy.importance_channel).
+    Returns: count_batch(no, stream) -> (sum_w, sum_w2, n_err, n_bits), snr_to_no
+    with w * e the likelihood-ratio weighted bit errors of each symbol.
+    """
+
+    def count_batch(no, stream):
+        rng = stream.rng()
+        with span("mapper"):
+            b = numpy_phy.random_bits(rng, batch_size, k)
+            x = numpy_phy.map_bits(b, k)
+        with span("channel"):
+            y, h, w = numpy_phy.importance_channel(rng, x, no, k, fading)
+        with span("demapper"):
+            llr = numpy_phy.demap_llr(y, no, k, h=h, method=demapping)
+            e = np.count_nonzero((llr > 0) != b, axis=1)
+            we = w * e
+        return float(we.sum()), float(we @ we), int(e.sum()), batch_size * k
+
+    return count_batch, lambda snr_db: float(numpy_phy.ebnodb2no(snr_db, k))
+
+
+# Per-process cache of Sionna layers for pool workers
+_WORKER_COUNTERS = {}
+
+
+def _ber_shard(spec, first, n_batches, seed):
+    """Pool worker: batches first .. first + n_batches - 1 of one SNR point."""
+    k, fading, demapping, batch_size = spec["k"], spec["fading"], spec["demapping"], spec["batch_size"]
+    if spec["backend"] == "numpy":
+        count_batch, snr_to_no = _numpy_counter(k, fading, demapping, batch_size)
+    else:
+        key = (k, fading, demapping, batch_size)
+        if key not in _WORKER_COUNTERS:
+            _WORKER_COUNTERS[key] = _sionna_counter(k, fading, demapping, batch_size)
+        count_batch, snr_to_no = _WORKER_COUNTERS[key]
+
+    no = snr_to_no(spec["snr_db"])
+    cell = _cell(k, fading, demapping, spec["snr_db"], batch_size)
+    n_err = 0
+    n_tot = 0
+    for b in range(first, first + n_batches):
+        e, t = count_batch(no, Stream(seed, cell, b))
+        n_err += e
+        n_tot += t
+    return n_err, n_tot
+
+
+def _sionna_graph_sweep(k, fading, demapping, batch_size, snr_db_list, prev, rule, sync_every=None, seed=0):
+    """
+    All SNR points as rows of one batched tensor, noise variance per row.
+    Errors accumulate on-device inside a tf.function step; the host reads the
+    counters once per sweep (or every `sync_every` batches when an
+    early-stopping rule needs them).
+    Bits, fading and noise are stateless draws keyed by (seed, sweep, step), so
+    a graph sweep replays exactly, but it isn't split-independent like the
+    loop / sharded paths (one stream covers all SNR points).
+    Returns: [(n_err, n_tot)] new counts per SNR point
+    """
+    import tensorflow as tf
+    cell = cell_id("ber_graph", k, bool(fading), demapping, tuple(float(s) for s in snr_db_list), int(batch_size))
+    _, Mapper, Demapper, _, _, ebnodb2no = phy_imports()
+
+    mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
+    demapper = Demapper(demapping, constellation_type="qam", num_bits_per_symbol=k)
+
+    S = len(snr_db_list)
+    bits_per_batch = batch_size * k
+    no = tf.reshape(tf.cast(ebnodb2no(tf.constant(snr_db_list, tf.float32), k, 1.0), tf.float32), [S, 1])
+    err_acc = tf.Variable(tf.zeros([S], tf.int64))
+
+    @tf.function
+    def step(active, seeds):
+        # seeds: [3, 2] stateless seed pairs for bits, noise, fading
+        b = tf.random.stateless_uniform([S, bits_per_batch], seeds[0], 0, 2, dtype=tf.int32)
+        x = mapper(b)                                          # [S, B]
+
+        n = tf_complex_normal([S, batch_size], seeds[1], no)
+        if fading:
+            h = tf_complex_normal([S, batch_size], seeds[2])
+            # Zero-forcing equalization -> per-symbol effective noise
+            y = x + n / h
+            no_eff = no / tf.abs(h) ** 2
+        else:
+            y, no_eff = x + n, no
+        try:
+            llr = demapper(y, no_eff)
+        except TypeError:
+            llr = demapper([y, no_eff])
+
+        b_hat = tf.cast(tf.reshape(llr, [S, bits_per_batch]) > 0, tf.int32)
+        err = tf.reduce_sum(tf.cast(tf.not_equal(b, b_hat), tf.int64), axis=1)
+        err_acc.assign_add(tf.where(active, err, tf.zeros_like(err)))
+
+    adaptive = rule.target_errors is not None or rule.ci_rel_width is not None
+    if not adaptive:
+        sync_every = None
+    elif sync_every is None:
+        sync_every = 10
+
+    n_tot = np.zeros(S, dtype=np.int64)
+    n_err = np.zeros(S, dtype=np.int64)
+    active = np.array([not rule.done(e, t) for e, t in prev])
+    done_batches = 0
+
+    while active.any():
+        with span("graph_step"):
+            seeds = [tf_seed(seed, cell, done_batches, draw) for draw in range(3)]
+            step(tf.constant(active), tf.constant(seeds, tf.int32))
+        n_tot[active] += bits_per_batch
+        done_batches += 1
+
+        # Fixed budget: deactivate rows without reading the device counters
+        for i in np.flatnonzero(active):
+            if prev[i][1] + n_tot[i] >= rule.cap:
+                active[i] = False
+
+        if sync_every and done_batches % sync_every == 0:
+            with span("host_sync"):
+                n_err = err_acc.numpy()
+            for i in np.flatnonzero(active):
+                if rule.done(prev[i][0] + n_err[i], prev[i][1] + n_tot[i]):
+                    active[i] = False
+
+    with span("host_sync"):
+        n_err = err_acc.numpy()                                # one host transfer
+    return [(int(e), int(t)) for e, t in zip(n_err, n_tot)]
+
+
+def iter_simulate_ber(
     modulation: str = "qpsk",
     channel: str = "awgn",          # "awgn" or "rayleigh"
     snr_db_list=None,              # e.g. [-5,0,5,10,15]
     n_bits: int = 200000,
-    batch_size: int = 2000,
-    out_dir: str = "outputs"
+    batch_size=2000,               # symbols per batch, or "auto": largest that fits memory_budget_mb
+    out_dir: str = "outputs",
+    store=None,                    # BerStore or path: reuse/top-up per-SNR counts
+    target_errors=None,            # stop a point after this many bit errors
+    ci_rel_width=None,             # ... or once the CI is this tight relative to BER
+    max_bits=None,                 # hard per-point cap (defaults to n_bits)
+    confidence: float = 0.95,
+    backend: str = "sionna",       # "sionna" | "numpy" | "auto"
+    demapping: str = "app",        # "app" (exact) or "maxlog"
+    sweep: str = "loop",           # "graph": all SNR points in one tf.function batch (sionna)
+    sync_every=None,               # graph sweep: host sync interval (batches) for early stopping
+    workers: int = 1,              # >1: shard (SNR, bit-chunk) cells over a process pool
+    render: str = "sync",          # "sync" | "background" | "none"
+    preview: bool = False,         # streaming: render a plot with every partial result
+    memory_budget_mb=None,         # batch_size="auto": budget (default: share of free RAM)
+    seed=None,                     # int: reproducible run (None: fresh seed, reported in kpis)
+    method: str = "mc",            # "mc" | "is" (importance sampling) | "theory" (closed form, no simulation)
+    theory_overlay: bool = True    # draw the closed-form curve next to simulated ones
 ):
+    """
+    Streaming BER sweep: yields a partial payload after each SNR point
+    (serial loop only; sharded / graph sweeps finish all points together),
+    then the final payload. simulate_ber() returns just the final one.
+
+    Batch j of an SNR point draws from the stream keyed by (seed, point, j)
+    (core.rng), so with a fixed budget the counts for a seed are identical
+    for any `workers`. Adaptive rules stop on round boundaries when sharded,
+    so they may simulate a few more batches than the serial loop.
+
+    method="is" estimates rare error rates (1e-7 and below) from biased
+    channel draws with likelihood-ratio weights (numpy_phy.importance_channel)
+    on the NumPy PHY, serially and without the store; "errors" are then the
+    raw error bits and ber_ci a normal interval. method="theory" returns the
+    exact hard-decision BER of square QAM (core.ber_theory) without
+    simulating. The closed form is reported as kpis["ber_theory"] either way.
+    """
     os.makedirs(out_dir, exist_ok=True)
     if snr_db_list is None:
         snr_db_list = [-5, 0, 5, 10, 15]
 
     try:
-        import tensorflow as tf
-        # Only need Mapper/Demapper/AWGN/FlatFading/ebnodb2no
-        _, Mapper, Demapper, AWGN, FlatFadingChannel, ebnodb2no = phy_imports()
-    except Exception as e:
-        return {"plots": [], "kpis": {}, "error": f"Sionna/TensorFlow import failed: {e}"}
+        backend = resolve_backend(backend)
+    except ValueError as e:
+        yield {"plots": [], "kpis": {}, "error": str(e)}
+        return
 
     mod = modulation.lower()
 
     # bits per symbol k
-    if mod == "qpsk":
-        k = 2
-    elif "qam" in mod:
-        M = int(mod.replace("qam", ""))
-        k = int(np.log2(M))
-    else:
-        return {"plots": [], "kpis": {}, "error": f"Unknown modulation: {modulation}"}
-
-    mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
-    demapper = Demapper("app", constellation_type="qam", num_bits_per_symbol=k)
+    try:
+        k = bits_per_symbol(mod)
+    except ValueError:
+        yield {"plots": [], "kpis": {}, "error": f"Unknown modulation: {modulation}"}
+        return
 
     fading = (channel.lower() == "rayleigh")
-    if fading:
-        ch = FlatFadingChannel(num_tx_ant=1, num_rx_ant=1, add_awgn=True)
-    else:
-        ch = AWGN()
+    seed = new_seed() if seed is None else int(seed)
 
-    bers = []
+    method = (method or "mc").lower()
+    if method not in METHODS:
+        yield {"plots": [], "kpis": {}, "error": f"Unknown method: {method} (use mc, is or theory)"}
+        return
+    theory = qam_ber_or_none(snr_db_list, k, channel)
+    if method != "mc" and theory is None:
+        yield {"plots": [], "kpis": {}, "error": f"method={method} needs square QAM, got {modulation}"}
+        return
+    if sweep not in SWEEPS:
+        yield {"plots": [], "kpis": {}, "error": f"Unknown sweep: {sweep} (use loop or graph)"}
+        return
+    # The graph sweep is a Sionna-only, single-process Monte Carlo path
+    sweep_note = None
+    unsupported = [why for why, bad in (
+        (f"backend={'numpy' if method == 'is' else backend}", backend != "sionna" or method == "is"),
+        (f"workers={workers}", bool(workers and workers > 1)),
+        (f"method={method}", method != "mc"),
+    ) if bad]
+    if sweep == "graph" and unsupported and method != "theory":
+        sweep_note = f"sweep='graph' is not supported with {', '.join(unsupported)}; ran the loop sweep"
+        logger.warning(sweep_note)
+    if method == "is":
+        # The estimator owns the noise density, so it runs on the NumPy PHY, one process
+        backend, workers, store = "numpy", 1, None
 
-    for snr_db in snr_db_list:
-        no = ebnodb2no(snr_db, k, coderate=1.0)
+    store = open_store(store)
+    rule = StoppingRule(n_bits, target_errors, ci_rel_width, max_bits, confidence)
 
-        n_err = 0
-        n_tot = 0
+    graph = sweep == "graph" and not unsupported
+    batching = {"auto": batch_size == "auto", "backoffs": 0}
+    if batching["auto"]:
+        # The graph sweep holds every SNR point in one batch
+        per_symbol = ber_bytes_per_symbol(k, fading, demapping, backend) * (len(snr_db_list) if graph else 1)
+        batch_size = auto_batch_size(
+            per_symbol, memory_budget_bytes(memory_budget_mb, workers), max_symbols=-(-rule.cap // k)
+        )
+    batch_size = int(batch_size)
 
-        while n_tot < n_bits:
-            b = tf.random.uniform([batch_size, k], 0, 2, dtype=tf.int32)
-            x = mapper(b)
+    # Start from stored counts, simulate only the missing bits
+    keys = [point_key(mod, channel, 1, 1, demapping, snr_db) for snr_db in snr_db_list]
+    prev = [store.get(key) if store is not None and method == "mc" else (0, 0) for key in keys]
+    # Everything that changes the numbers, including the stored counts topped up and the seed
+    path = plot_path(out_dir, f"ber_{mod}_{channel}", [
+        snr_db_list, n_bits, target_errors, ci_rel_width, max_bits, confidence, backend, demapping, method,
+        theory_overlay, graph, workers, batch_size, prev, seed
+    ])
 
-            if fading:
-                # Sionna 1.x style
-                try:
-                    y, h = ch(x, no)
-                except TypeError:
-                    # old fallback
-                    y, h = ch([x, no])
-                llr = demapper(y, h, no) if hasattr(demapper, "__call__") else demapper([y, h, no])
-            else:
-                try:
-                    y = ch(x, no)
-                except TypeError:
-                    y = ch([x, no])
-                llr = demapper(y, no) if hasattr(demapper, "__call__") else demapper([y, no])
+    # Nothing is simulated in theory mode: no backend, batching or seed to report
+    simulated = method != "theory"
 
-            b_hat = tf.cast(llr > 0, tf.int32)
-            n_err += tf.reduce_sum(tf.cast(tf.not_equal(b, b_hat), tf.int32)).numpy()
-            n_tot += batch_size * k
-
-        bers.append(n_err / n_tot)
-
-    # Plot
-    fig = plt.figure()
-    plt.semilogy(snr_db_list, bers, marker="o")
-    plt.title(f"BER vs SNR ({modulation.upper()} - {channel.upper()})")
-    plt.xlabel("SNR (dB)")
-    plt.ylabel("BER")
-    plt.grid(True, which="both")
-
-    plot_path = os.path.join(out_dir, f"ber_{mod}_{channel}.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
-
-    return {
-        "plots": [plot_path],
-        "kpis": {
-            "snr_db": snr_db_list,
-            "ber": bers,
-            "modulation": modulation,
-            "channel": channel
+    def payload(new, mode):
+        """KPIs / arrays / plot (render `mode`) for the points simulated so far."""
+        snrs = snr_db_list[:len(new)]
+        if method == "theory":
+            points = [{"ber": ber, "errors": None, "bits": 0, "ci": [ber, ber]} for ber in theory]
+        elif method == "is":
+            points = [is_point_kpis(*acc, k, confidence) for acc in new]
+        else:
+            points = [point_kpis(pe + ne, pt + nt, confidence) for (pe, pt), (ne, nt) in zip(prev, new)]
+        bers = [pt["ber"] for pt in points]
+        data = {
+            "snr_db": np.asarray(snrs, dtype=np.float32),
+            "ber": np.asarray(bers, dtype=np.float32),
         }
-    }
+        if theory is not None and theory_overlay and method != "theory":
+            data["ber_theory"] = np.asarray(theory[:len(new)], dtype=np.float32)
+
+        # Plot
+        with span("plot"):
+            plots = render_plot(
+                "ber", path if len(new) == len(snr_db_list) else path.replace(".png", "_partial.png"),
+                data, mode=mode,
+                title=f"BER vs SNR ({modulation.upper()} - {channel.upper()})"
+            )
+
+        return {
+            "plots": plots,
+            "kpis": {
+                "snr_db": snrs,
+                "ber": bers,
+                "errors": [pt["errors"] for pt in points],
+                "bits": [pt["bits"] for pt in points],
+                "bits_new": [acc[-1] for acc in new],         # simulated by this call; bits adds stored counts
+                "ber_ci": [pt["ci"] for pt in points],
+                "confidence": confidence,
+                "modulation": modulation,
+                "channel": channel,
+                "backend": backend if simulated else None,
+                "method": method,
+                "ber_theory": theory[:len(new)] if theory is not None else None,
+                "sweep": ("graph" if graph else "loop") if simulated else None,
+                "sweep_note": sweep_note,
+                "workers": workers if simulated else None,
+                "batch_size": batch_size if simulated else None,
+                "batch_size_auto": batching["auto"] if simulated else None,
+                "batch_backoffs": batching["backoffs"] if simulated else None,
+                "bits_simulated": sum(acc[-1] for acc in new),
+                "seed": seed if simulated else None
+            },
+            "data": data
+        }
+
+    if method == "theory":
+        new = [(0, 0)] * len(snr_db_list)
+    elif method == "is":
+        count_batch = BackoffCounter(lambda bs: _numpy_is_counter(k, fading, demapping, bs), batch_size)
+        new = []
+        for snr_db in snr_db_list:
+            no = count_batch.snr_to_no(snr_db)
+            acc = (0.0, 0.0, 0, 0)                             # sum_w, sum_w2, n_err, n_tot
+            b = 0
+            while not rule.done_is(*acc, k):
+                cell = _cell(k, fading, demapping, snr_db, count_batch.batch_size, method)
+                acc = tuple(a + c for a, c in zip(acc, count_batch(no, Stream(seed, cell, b))))
+                b += 1
+            new.append(acc)
+            batch_size, batching["backoffs"] = count_batch.batch_size, count_batch.backoffs
+            if len(new) < len(snr_db_list):
+                yield as_partial(
+                    payload(new, render if preview else "none"), len(new), len(snr_db_list), "snr point"
+                )
+    elif workers and workers > 1:
+        specs = [
+            {"k": k, "fading": fading, "demapping": demapping, "batch_size": batch_size,
+             "backend": backend, "snr_db": snr_db}
+            for snr_db in snr_db_list
+        ]
+        try:
+            new = run_sharded(
+                _ber_shard, specs, prev, rule, batch_size * k, workers,
+                # TF is not fork-safe: Sionna workers start from a clean interpreter
+                start_method="spawn" if backend == "sionna" else None, seed=seed,
+            )
+        except ImportError as e:
+            yield {"plots": [], "kpis": {}, "error": f"Sionna/TensorFlow import failed: {e}"}
+            return
+    elif graph:
+        while True:
+            try:
+                new = _sionna_graph_sweep(
+                    k, fading, demapping, batch_size, snr_db_list, prev, rule, sync_every, seed
+                )
+                break
+            except ImportError as e:
+                yield {"plots": [], "kpis": {}, "error": f"Sionna/TensorFlow import failed: {e}"}
+                return
+            except Exception as e:
+                # Out of device memory: restart the sweep with half the batch
+                if not is_oom(e) or batch_size <= MIN_BATCH:
+                    raise
+                batch_size = max(MIN_BATCH, batch_size // 2)
+                batching["backoffs"] += 1
+    else:
+        if backend == "numpy":
+            factory = lambda bs: _numpy_counter(k, fading, demapping, bs)
+        else:
+            factory = lambda bs: _sionna_counter(k, fading, demapping, bs)
+        try:
+            count_batch = BackoffCounter(factory, batch_size)
+        except Exception as e:
+            if is_oom(e):
+                raise
+            yield {"plots": [], "kpis": {}, "error": f"Sionna/TensorFlow import failed: {e}"}
+            return
+        snr_to_no = count_batch.snr_to_no
+
+        new = []
+        for snr_db, (prev_err, prev_tot) in zip(snr_db_list, prev):
+            no = snr_to_no(snr_db)
+            b = first_batch(prev_tot, count_batch.batch_size * k)
+            n_err = 0
+            n_tot = 0
+            while not rule.done(prev_err + n_err, prev_tot + n_tot):
+                cell = _cell(k, fading, demapping, snr_db, count_batch.batch_size)
+                e, t = count_batch(no, Stream(seed, cell, b))
+                b += 1
+                n_err += e
+                n_tot += t
+            new.append((n_err, n_tot))
+            batch_size, batching["backoffs"] = count_batch.batch_size, count_batch.backoffs
+            if len(new) < len(snr_db_list):
+                yield as_partial(
+                    payload(new, render if preview else "none"), len(new), len(snr_db_list), "snr point"
+                )
+
+    if store is not None:
+        for key, (n_err, n_tot) in zip(keys, new):
+            if n_tot:
+                store.add(key, n_err, n_tot)
+        store.flush()
+
+    yield payload(new, render)
+
+
+simulate_ber = run_to_completion(iter_simulate_ber, "simulate_ber")
@@ -1,60 +1,203 @@
 import os
 import numpy as np
-import matplotlib.pyplot as plt
-from core.sionna_compat import phy_imports
+from core.tracing import span
+from core.render import plot_path, render as render_plot
+from core.streaming import as_partial, run_to_completion
+from core.sionna_compat import phy_imports, resolve_backend
+from core import numpy_phy
+from core.ber_store import open_store, point_key
+from core.ber_stats import StoppingRule, point_kpis
+from core.ber_theory import qam_ber_or_none
+from core.parallel_mc import first_batch, run_sharded
+from core.rng import Stream, cell_id, new_seed, tf_complex_normal
+from core.batching import BackoffCounter, auto_batch_size, is_oom, memory_budget_bytes, mimo_bytes_per_symbol
 
 
-def _qam_constellation(M: int):
+METHODS = ("mc", "theory")
+
+
+# BerStore tag of this link: bump it whenever the link changes, so counts
+# stored by an older model are never topped up with new ones
+# ("hard_mrc": the biased combiner before the MRC fix). Keep
+# core.result_cache.TOOL_VERSIONS["simulate_ber_mimo"] in step with it.
+LINK_MODEL = "mrc_v2"
+
+
+def _cell(k, nt, nr, snr_db, batch_size):
+    """Stream cell of one (config, SNR) point (core.rng), shared by both backends."""
+    return cell_id("ber_mimo", k, int(nt), int(nr), float(snr_db), int(batch_size))
+
+
+def _sionna_mimo_link(k, nt, nr, batch_size):
+    """
+    Sionna Mapper + a stateless Rayleigh channel for one antenna config.
+    Bits come from the symbol indices via numpy_phy.bit_table, so the Sionna
+    Gray mapper and the NumPy slicer share one labelling. Fading and noise are
+    drawn from the batch's stream (core.rng.tf_complex_normal), not from a
+    global TF seed.
+    Returns: draw_batch(no, stream) -> (idx [B], y [B,nr], g [B,nr]) as NumPy, snr_to_no
+    """
+    with span("setup"):
+        import tensorflow as tf
+        _, Mapper, _, _, _, ebnodb2no = phy_imports()
+
+        mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
+        table = numpy_phy.bit_table(k).astype(np.int32)
+
+    def draw_batch(no, stream):
+        # ---- Bits -> Symbols ----
+        idx = stream.rng().integers(0, 2 ** k, size=batch_size)
+        x = tf.reshape(mapper(tf.constant(table[idx])), [batch_size, 1])   # [B, 1]
+
+        # ---- Channel: h [B, nr, nt] ~ CN(0, 1), same symbol on every TX antenna ----
+        h = tf_complex_normal([batch_size, nr, nt], stream.tf_seed(1))
+        n = tf_complex_normal([batch_size, nr], stream.tf_seed(0), no)
+        # Effective channel g = sum_t h[:, :, t]
+        g = tf.reduce_sum(h, axis=2)                                         # [B, nr]
+        y = g * x + n                                                        # [B, nr]
+
+        return idx, y.numpy(), g.numpy()
+
+    return draw_batch, lambda snr_db: ebnodb2no(snr_db, k, coderate=1.0)
+
+
+def _numpy_mimo_link(k, nt, nr, batch_size):
+    """
+    Same repetition-TX link in pure NumPy (core.numpy_phy), no TensorFlow.
+    Draws straight into preallocated buffers; the returned arrays are
+    overwritten by the next call.
+    """
+    const = numpy_phy.qam_constellation(k)
+
+    g_buf = np.empty((batch_size, nr, 2))        # re/im pairs, viewed as complex below
+    n_buf = np.empty((batch_size, nr, 2))
+    g = g_buf.view(np.complex128)[..., 0]        # [B, nr]
+    n = n_buf.view(np.complex128)[..., 0]
+    x = np.empty(batch_size, dtype=np.complex128)
+    y = np.empty((batch_size, nr), dtype=np.complex128)
+
+    def draw_batch(no, stream):
+        rng = stream.rng()
+        idx = rng.integers(0, 2 ** k, size=batch_size)                      # [B]
+        np.take(const, idx, out=x)
+        # Same symbol on every TX antenna -> y = g x + n, g = sum_t h[:, :, t] ~ CN(0, nt)
+        rng.standard_normal(out=g_buf)
+        np.multiply(g_buf, np.sqrt(nt / 2), out=g_buf)
+        rng.standard_normal(out=n_buf)
+        np.multiply(n_buf, np.sqrt(no / 2), out=n_buf)
+        np.multiply(g, x[:, None], out=y)
+        np.add(y, n, out=y)                                                  # [B, nr]
+        return idx, y, g
+
+    return draw_batch, lambda snr_db: float(numpy_phy.ebnodb2no(snr_db, k))
+
+
+def _mimo_counter(backend, k, nt, nr, batch_size):
     """
-    Square M-QAM constellation (unit average power).
-    Returns: complex numpy array of shape [M].
+    Link + MRC + hard demap for one antenna config.
+    Returns: count_batch(no, stream) -> (n_err, n_bits), snr_to_no
     """
-    m_side = int(np.sqrt(M))
-    assert m_side * m_side == M, "M must be a square number (e.g., 4,16,64,256)."
+    if backend == "numpy":
+        draw_batch, snr_to_no = _numpy_mimo_link(k, nt, nr, batch_size)
+    else:
+        draw_batch, snr_to_no = _sionna_mimo_link(k, nt, nr, batch_size)
+    popcount = numpy_phy.popcount_table(k)
+    gy = np.empty((batch_size, nr), dtype=np.complex128)
+
+    def count_batch(no, stream):
+        with span("channel"):
+            idx, y_np, g = draw_batch(no, stream)
 
-    re = np.arange(-(m_side - 1), m_side + 1, 2)
-    im = np.arange(-(m_side - 1), m_side + 1, 2)
-    grid = re[None, :] + 1j * im[:, None]
-    pts = grid.flatten()
+        # ---- MRC combining for repetition baseline ----
+        with span("combine"):
+            # s_hat = sum_r conj(g[r]) y[r] / sum_r |g[r]|^2
+            np.multiply(np.conj(g), y_np, out=gy)
+            num = gy.sum(axis=1)                                         # [B]
+            den = (g.real ** 2 + g.imag ** 2).sum(axis=1) + 1e-9         # [B]
+            s_hat = num / den                                            # [B]
 
-    # Normalize to unit average power
-    pts = pts / np.sqrt(np.mean(np.abs(pts) ** 2))
-    return pts
+        # ---- Hard demap: per-axis PAM slicer, O(1) per symbol ----
+        with span("demapper"):
+            idx_hat = numpy_phy.qam_hard_slice(s_hat, k)                 # [B]
 
+        # ---- Count bit errors via popcount of the label difference ----
+        return int(popcount[idx ^ idx_hat].sum()), batch_size * k
 
-def _bits_to_int(bits):
-    """bits: [..., k] -> integer indices [...]"""
-    out = np.zeros(bits.shape[:-1], dtype=np.int32)
-    for i in range(bits.shape[-1]):
-        out = (out << 1) | bits[..., i]
-    return out
+    return count_batch, snr_to_no
 
 
-def _int_to_bits(idx, k):
-    """idx: [...] -> bits [..., k]"""
-    bits = np.zeros((*idx.shape, k), dtype=np.int32)
-    for i in range(k - 1, -1, -1):
-        bits[..., i] = idx & 1
-        idx = idx >> 1
-    return bits
+# Per-process cache of Sionna layers for pool workers
+_WORKER_COUNTERS = {}
 
 
-def simulate_ber_mimo(
+def _mimo_shard(spec, first, n_batches, seed):
+    """Pool worker: batches first .. first + n_batches - 1 of one (config, SNR) cell."""
+    k, nt, nr, batch_size = spec["k"], spec["nt"], spec["nr"], spec["batch_size"]
+    if spec["backend"] == "numpy":
+        count_batch, snr_to_no = _mimo_counter("numpy", k, nt, nr, batch_size)
+    else:
+        key = (k, nt, nr, batch_size)
+        if key not in _WORKER_COUNTERS:
+            _WORKER_COUNTERS[key] = _mimo_counter("sionna", k, nt, nr, batch_size)
+        count_batch, snr_to_no = _WORKER_COUNTERS[key]
+
+    no = snr_to_no(spec["snr_db"])
+    cell = _cell(k, nt, nr, spec["snr_db"], batch_size)
+    n_err = 0
+    n_tot = 0
+    for b in range(first, first + n_batches):
+        e, t = count_batch(no, Stream(seed, cell, b))
+        n_err += e
+        n_tot += t
+    return n_err, n_tot
+
+
+def iter_simulate_ber_mimo(
     modulation: str = "64qam",
     snr_db_list=None,
     configs=None,                   # e.g. [{"nt":1,"nr":1},{"nt":4,"nr":4}]
     n_bits: int = 30000,            # CPU-safe default
-    batch_size: int = 200,          # CPU-safe default
-    out_dir: str = "outputs"
+    batch_size=200,                 # CPU-safe default; "auto": largest per config that fits memory_budget_mb
+    out_dir: str = "outputs",
+    store=None,                     # BerStore or path: reuse/top-up per-SNR counts
+    target_errors=None,             # stop a point after this many bit errors
+    ci_rel_width=None,              # ... or once the CI is this tight relative to BER
+    max_bits=None,                  # hard per-point cap (defaults to n_bits)
+    confidence: float = 0.95,
+    backend: str = "sionna",        # "sionna" | "numpy" | "auto"
+    workers: int = 1,               # >1: shard (config, SNR, bit-chunk) cells over a process pool
+    render: str = "sync",           # "sync" | "background" | "none"
+    preview: bool = False,          # streaming: render a plot with every partial result
+    memory_budget_mb=None,          # batch_size="auto": budget (default: share of free RAM)
+    seed=None,                      # int: reproducible run (None: fresh seed, reported in kpis)
+    method: str = "mc",             # "mc" | "theory" (closed form, no simulation)
+    theory_overlay: bool = True     # draw the closed-form curves next to the simulated ones
 ):
     """
     CPU-friendly MIMO BER baseline:
-    - Uses Sionna Mapper + FlatFadingChannel
+    - Uses Sionna Mapper + stateless Rayleigh draws (or core.numpy_phy with backend="numpy")
     - Repetition across TX antennas
     - MRC combining
-    - Nearest-neighbor hard demapping in NumPy
+    - Nearest-neighbor hard demapping in NumPy (per-axis PAM slicer, O(1) per symbol)
 
     This avoids APP-demapper OOM on CPU.
+
+    With `store`, per-(config, SNR) error/bit counts persist across calls and
+    only the bits missing from the n_bits target are simulated.
+
+    target_errors / ci_rel_width / max_bits switch each SNR point to
+    error-count based early stopping (see core.ber_stats.StoppingRule).
+
+    Yields a partial payload after each (config, SNR) point of the serial
+    loop, then the final one; simulate_ber_mimo() returns just the final one.
+
+    Batch j of a (config, SNR) point draws from the stream keyed by
+    (seed, point, j) (core.rng): with a fixed budget, the counts for a seed
+    don't depend on `workers`.
+
+    The closed form of this link (Rayleigh, MRC over nr branches of gain nt,
+    core.ber_theory) is reported as kpis["ber_theory"] per config;
+    method="theory" returns just that, without simulating.
     """
 
     os.makedirs(out_dir, exist_ok=True)
@@ -65,133 +208,180 @@ def simulate_ber_mimo(
         configs = [{"nt": 1, "nr": 1}, {"nt": 4, "nr": 4}]
 
     try:
-        import tensorflow as tf
-        _, Mapper, _, _, FlatFadingChannel, ebnodb2no = phy_imports()
-    except Exception as e:
-        return {
-            "plots": [],
-            "kpis": {},
-            "error": f"Sionna/TensorFlow import failed: {e}"
-        }
+        backend = resolve_backend(backend)
+    except ValueError as e:
+        yield {"plots": [], "kpis": {}, "error": str(e)}
+        return
 
     mod = modulation.lower()
     if "qam" in mod:
         M = int(mod.replace("qam", ""))
         k = int(np.log2(M))
     else:
-        return {
+        yield {
             "plots": [],
             "kpis": {},
             "error": f"Unknown modulation: {modulation}"
         }
+        return
+
+    method = (method or "mc").lower()
+    if method not in METHODS:
+        yield {"plots": [], "kpis": {}, "error": f"Unknown method: {method} (use mc or theory)"}
+        return
+    if method == "theory" and k % 2:
+        yield {"plots": [], "kpis": {}, "error": f"method=theory needs square QAM, got {modulation}"}
+        return
+    simulated = method != "theory"
+
+    seed = new_seed() if seed is None else int(seed)
+    store = open_store(store) if simulated else None
+    rule = StoppingRule(n_bits, target_errors, ci_rel_width, max_bits, confidence)
+
+    # One cell per (config, SNR); start from stored counts
+    cells = [(cfg["nt"], cfg["nr"], snr_db) for cfg in configs for snr_db in snr_db_list]
+    keys = [point_key(mod, "rayleigh", nt, nr, LINK_MODEL, snr_db) for nt, nr, snr_db in cells]
+    prev = [store.get(key) if store is not None else (0, 0) for key in keys]
+
+    # Batch size per antenna config ("auto": sized from that config's memory footprint)
+    auto = batch_size == "auto"
+    budget = memory_budget_bytes(memory_budget_mb, workers)
+    batch_sizes = {
+        (cfg["nt"], cfg["nr"]): auto_batch_size(
+            mimo_bytes_per_symbol(k, cfg["nt"], cfg["nr"], backend), budget, max_symbols=-(-rule.cap // k)
+        ) if auto else int(batch_size)
+        for cfg in configs
+    }
+    backoffs = {}
+    theory = {
+        f"{cfg['nt']}x{cfg['nr']}": qam_ber_or_none(snr_db_list, k, "rayleigh", diversity=cfg["nr"], gain=cfg["nt"])
+        for cfg in configs
+    }
+    # Everything that changes the numbers, including the stored counts topped up and the seed
+    path = plot_path(out_dir, f"ber_mimo_{mod}", [
+        snr_db_list, configs, n_bits, target_errors, ci_rel_width, max_bits, confidence, backend, method,
+        theory_overlay, workers, [batch_sizes[(cfg["nt"], cfg["nr"])] for cfg in configs], prev, seed
+    ])
+
+    def payload(new, mode):
+        """KPIs / arrays / plot (render `mode`) for the cells simulated so far."""
+        all_bers = {}
+        all_points = {}
+        for i, ((nt, nr, _), (prev_err, prev_tot), (n_err, n_tot)) in enumerate(zip(cells, prev, new)):
+            label = f"{nt}x{nr}"
+            if simulated:
+                pt = point_kpis(prev_err + n_err, prev_tot + n_tot, confidence)
+            else:
+                ber = theory[label][i % len(snr_db_list)]
+                pt = {"ber": ber, "errors": None, "bits": 0, "ci": [ber, ber]}
+            all_points.setdefault(label, []).append(pt)
+            all_bers.setdefault(label, []).append(pt["ber"])
+
+        data = {
+            "snr_db": np.asarray(snr_db_list, dtype=np.float32),
+            "ber": {label: np.asarray(bers, dtype=np.float32) for label, bers in all_bers.items()},
+        }
+        if theory_overlay and k % 2 == 0 and simulated:
+            data["ber_theory"] = {label: np.asarray(theory[label], dtype=np.float32) for label in all_bers}
 
-    mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
-    const_pts = _qam_constellation(M)
-
-    all_bers = {}
-
-    for cfg in configs:
-        nt, nr = cfg["nt"], cfg["nr"]
-        label = f"{nt}x{nr}"
-
-        ch = FlatFadingChannel(num_tx_ant=nt, num_rx_ant=nr, add_awgn=True)
+        # ---- Plot ----
+        with span("plot"):
+            plots = render_plot(
+                "ber_mimo", path if len(new) == len(cells) else path.replace(".png", "_partial.png"),
+                data, mode=mode,
+                title=f"MIMO BER (Hard Demap + MRC, CPU-safe) – {modulation.upper()}"
+            )
 
-        bers = []
-        for snr_db in snr_db_list:
-            no = ebnodb2no(snr_db, k, coderate=1.0)
+        return {
+            "plots": plots,
+            "kpis": {
+                "configs": configs,
+                "snr_db": snr_db_list,
+                "ber": all_bers,
+                "errors": {lb: [pt["errors"] for pt in pts] for lb, pts in all_points.items()},
+                "bits": {lb: [pt["bits"] for pt in pts] for lb, pts in all_points.items()},
+                "ber_ci": {lb: [pt["ci"] for pt in pts] for lb, pts in all_points.items()},
+                "confidence": confidence,
+                "modulation": modulation,
+                "backend": backend if simulated else None,
+                "method": method,
+                "workers": workers if simulated else None,
+                "batch_size": {f"{nt}x{nr}": bs for (nt, nr), bs in batch_sizes.items()} if simulated else None,
+                "batch_size_auto": auto if simulated else None,
+                "batch_backoffs": sum(backoffs.values()) if simulated else None,
+                "bits_simulated": sum(nt for _, nt in new),
+                "seed": seed if simulated else None,
+                "ber_theory": theory,
+                "note": "CPU-friendly baseline: repetition TX + MRC + hard demap."
+            },
+            "data": data
+        }
 
+    if not simulated:
+        new = [(0, 0)] * len(cells)
+    elif workers and workers > 1:
+        specs = [
+            {"k": k, "nt": nt, "nr": nr, "batch_size": batch_sizes[(nt, nr)], "backend": backend,
+             "snr_db": snr_db}
+            for nt, nr, snr_db in cells
+        ]
+        try:
+            new = run_sharded(
+                _mimo_shard, specs, prev, rule, [spec["batch_size"] * k for spec in specs], workers,
+                # TF is not fork-safe: Sionna workers start from a clean interpreter
+                start_method="spawn" if backend == "sionna" else None, seed=seed,
+            )
+        except ImportError as e:
+            yield {
+                "plots": [],
+                "kpis": {},
+                "error": f"Sionna/TensorFlow import failed: {e}"
+            }
+            return
+    else:
+        new = []
+        counters = {}
+        for (nt, nr, snr_db), (prev_err, prev_tot) in zip(cells, prev):
+            if (nt, nr) not in counters:
+                try:
+                    counters[(nt, nr)] = BackoffCounter(
+                        lambda bs, nt=nt, nr=nr: _mimo_counter(backend, k, nt, nr, bs), batch_sizes[(nt, nr)]
+                    )
+                except Exception as e:
+                    if is_oom(e):
+                        raise
+                    yield {
+                        "plots": [],
+                        "kpis": {},
+                        "error": f"Sionna/TensorFlow import failed: {e}"
+                    }
+                    return
+            count_batch = counters[(nt, nr)]
+            no = count_batch.snr_to_no(snr_db)
+
+            b = first_batch(prev_tot, count_batch.batch_size * k)
             n_err = 0
             n_tot = 0
-            target_bits = n_bits
-
-            while n_tot < target_bits:
-                # ---- Bits -> Symbols ----
-                b = tf.random.uniform([batch_size, k], 0, 2, dtype=tf.int32)
-                x = mapper(b)  # typically [B, 1] complex
-
-                # Repeat same symbol across nt TX antennas
-                x_mimo = tf.tile(tf.expand_dims(x, axis=2), [1, 1, nt])  # [B,1,nt] or similar
-
-                # ---- Channel ----
-                try:
-                    out = ch(x_mimo, no)       # Sionna 1.x style
-                except TypeError:
-                    out = ch([x_mimo, no])    # old fallback
-
-                if isinstance(out, tuple):
-                    y = out[0]
-                    h = out[1] if len(out) > 1 else None
-                else:
-                    y = out
-                    h = None
-
-                # ---- Convert to numpy ----
-                y_np = y.numpy()
-                if h is not None:
-                    h_np = h.numpy()
-                else:
-                    h_np = np.ones((batch_size, nr, nt), dtype=np.complex64)
-
-                # ---- Make shapes robust ----
-                # y_np could be [B, nr] or [B, 1, nr]
-                if y_np.ndim == 3:
-                    y_np = y_np[:, 0, :]   # -> [B, nr]
-                elif y_np.ndim == 2:
-                    pass                   # already [B, nr]
-                else:
-                    raise ValueError(f"Unexpected y shape: {y_np.shape}")
-
-                # h_np could be [B, nr, nt] or [B, 1, nr, nt]
-                if h_np.ndim == 4:
-                    h_np = h_np[:, 0, :, :]  # -> [B, nr, nt]
-                elif h_np.ndim == 3:
-                    pass
-                else:
-                    raise ValueError(f"Unexpected h shape: {h_np.shape}")
-
-                # ---- MRC combining for repetition baseline ----
-                # num = sum_{r,t} conj(h[r,t]) * y[r]
-                num = np.sum(np.conj(h_np) * y_np[:, :, None], axis=(1, 2))  # [B]
-                den = np.sum(np.abs(h_np) ** 2, axis=(1, 2)) + 1e-9          # [B]
-                s_hat = num / den                                           # [B]
-
-                # ---- Hard nearest-neighbor demap ----
-                d2 = np.abs(s_hat[:, None] - const_pts[None, :]) ** 2        # [B, M]
-                sym_idx_hat = np.argmin(d2, axis=1)                          # [B]
-                b_hat = _int_to_bits(sym_idx_hat, k)                         # [B, k]
-
-                b_np = b.numpy().reshape(batch_size, k)                      # [B, k]
-
-                # ---- Count errors ----
-                n_err += np.sum(b_hat != b_np)
-                n_tot += batch_size * k
-
-            bers.append(n_err / n_tot)
-
-        all_bers[label] = bers
-
-    # ---- Plot ----
-    fig = plt.figure()
-    for label, bers in all_bers.items():
-        plt.semilogy(snr_db_list, bers, marker="o", label=label)
-
-    plt.title(f"MIMO BER (Hard Demap + MRC, CPU-safe) – {modulation.upper()}")
-    plt.xlabel("SNR (dB)")
-    plt.ylabel("BER")
-    plt.grid(True, which="both")
-    plt.legend()
-
-    plot_path = os.path.join(out_dir, f"ber_mimo_{mod}.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
-
-    return {
-        "plots": [plot_path],
-        "kpis": {
-            "configs": configs,
-            "snr_db": snr_db_list,
-            "ber": all_bers,
-            "modulation": modulation,
-            "note": "CPU-friendly baseline: repetition TX + MRC + hard demap."
-        }
-    }
+            while not rule.done(prev_err + n_err, prev_tot + n_tot):
+                cell = _cell(k, nt, nr, snr_db, count_batch.batch_size)
+                e, t = count_batch(no, Stream(seed, cell, b))
+                b += 1
+                n_err += e
+                n_tot += t
+            new.append((n_err, n_tot))
+            batch_sizes[(nt, nr)], backoffs[(nt, nr)] = count_batch.batch_size, count_batch.backoffs
+            if len(new) < len(cells):
+                yield as_partial(
+                    payload(new, render if preview else "none"), len(new), len(cells), "mimo point"
+                )
+
+    if store is not None:
+        for key, (n_err, n_tot) in zip(keys, new):
+            if n_tot:
+                store.add(key, n_err, n_tot)
+        store.flush()
+
+    yield payload(new, render)
+
+
+simulate_ber_mimo = run_to_completion(iter_simulate_ber_mimo, "simulate_ber_mimo")
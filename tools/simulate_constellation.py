@@ -1,24 +1,44 @@
-import sys, os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-from core.sionna_compat import phy_imports
+from core.tracing import span
+from core.render import plot_path, render as render_plot
+from core.sionna_compat import phy_imports, resolve_backend
+from core import numpy_phy
+from core.rng import Stream, cell_id, new_seed, tf_complex_normal
+
+
+def _sionna_symbols(k, n_symbols, noise_var, stream):
+    import tensorflow as tf
+    _, Mapper, _, _, _, _ = phy_imports()
+
+    # Sionna 1.x way: no Constellation object needed
+    mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
+
+    # Random bits -> symbols
+    bits = tf.constant(numpy_phy.random_bits(stream.rng(), n_symbols, k), dtype=tf.int32)
+    x = mapper(bits)
+
+    # AWGN drawn from the stream (stateless), not from a global TF seed
+    y = x + tf_complex_normal(tf.shape(x), stream.tf_seed(), noise_var)
+
+    return y.numpy().reshape(-1)
 
 
 def simulate_constellation(
     modulation: str = "16qam",
     snr_db: float = 15.0,
     n_symbols: int = 2000,
-    out_dir: str = "outputs"
+    out_dir: str = "outputs",
+    backend: str = "sionna",       # "sionna" | "numpy" | "auto"
+    render: str = "sync",          # "sync" | "background" | "none"
+    seed=None                      # int: reproducible symbols (None: fresh seed, reported in kpis)
 ):
     os.makedirs(out_dir, exist_ok=True)
 
     try:
-        import tensorflow as tf
-        _, Mapper, _, AWGN, _, _ = phy_imports()
-    except Exception as e:
-        return {"plots": [], "kpis": {}, "error": f"Sionna/TensorFlow import failed: {e}"}
+        backend = resolve_backend(backend)
+    except ValueError as e:
+        return {"plots": [], "kpis": {}, "error": str(e)}
 
     mod = modulation.lower()
 
@@ -32,39 +52,36 @@ def simulate_constellation(
     else:
         return {"plots": [], "kpis": {}, "error": f"Unknown modulation: {modulation}"}
 
-    # Sionna 1.x way: no Constellation object needed
-    mapper = Mapper(constellation_type="qam", num_bits_per_symbol=k)
-    awgn = AWGN()
-
-    # Random bits -> symbols
-    bits = tf.random.uniform([n_symbols, k], 0, 2, dtype=tf.int32)
-    x = mapper(bits)
-
     # Noise variance
     snr_lin = 10 ** (snr_db / 10)
     noise_var = 1.0 / snr_lin
+    seed = new_seed() if seed is None else int(seed)
+    stream = Stream(seed, cell_id("constellation", k, float(snr_db), int(n_symbols)), 0)
 
-    #  AWGN call differs between 1.x and 0.x -> support both
-    try:
-        y = awgn(x, tf.constant(noise_var, tf.float32))     # Sionna 1.x style :contentReference[oaicite:1]{index=1}
-    except TypeError:
-        y = awgn([x, tf.constant(noise_var, tf.float32)])   # Sionna 0.x fallback
+    with span("simulate"):
+        if backend == "numpy":
+            rng = stream.rng()
+            bits = numpy_phy.random_bits(rng, n_symbols, k)
+            y_np = numpy_phy.awgn(rng, numpy_phy.map_bits(bits, k), noise_var)
+        else:
+            try:
+                y_np = _sionna_symbols(k, n_symbols, noise_var, stream)
+            except Exception as e:
+                return {"plots": [], "kpis": {}, "error": f"Sionna/TensorFlow import failed: {e}"}
 
-    y_np = y.numpy().reshape(-1)
+    data = {"symbols": np.asarray(y_np).astype(np.complex64, copy=False)}
 
     # Plot
-    fig = plt.figure(figsize=(5, 5))
-    plt.scatter(np.real(y_np), np.imag(y_np), s=6, alpha=0.6)
-    plt.title(f"{modulation.upper()} Constellation @ {snr_db} dB")
-    plt.xlabel("In-phase")
-    plt.ylabel("Quadrature")
-    plt.grid(True)
-
-    plot_path = os.path.join(out_dir, f"constellation_{mod}_{snr_db}db.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
+    with span("plot"):
+        path = plot_path(out_dir, f"constellation_{mod}_{snr_db}db", [n_symbols, backend, seed])
+        plots = render_plot(
+            "constellation", path, data, mode=render,
+            title=f"{modulation.upper()} Constellation @ {snr_db} dB"
+        )
 
     return {
-        "plots": [plot_path],
-        "kpis": {"modulation": modulation, "snr_db": snr_db, "n_symbols": n_symbols}
+        "plots": plots,
+        "kpis": {"modulation": modulation, "snr_db": snr_db, "n_symbols": n_symbols, "backend": backend,
+                 "seed": seed},
+        "data": data
     }
@@ -1,8 +1,20 @@
 import os
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
+from core.tracing import span
+from core.render import plot_path, render as render_plot
+from core.pathloss import combine_received_power, grid_axes, serving_power, thermal_noise_dbm
+from core.streaming import as_partial, run_to_completion
 
-def simulate_multi_radio_map(
+
+def _grid_file(out_npy, name):
+    """Sibling .npy of out_npy for an extra per-pixel array."""
+    if name == "power_dbm":
+        return out_npy
+    return f"{os.path.splitext(out_npy)[0]}_{name}.npy"
+
+
+def iter_simulate_multi_radio_map(
     tx_positions=None,           # list of (x,y,z)
     rx_grid_size=80,
     area_size=(200, 200),
@@ -10,68 +22,186 @@ def simulate_multi_radio_map(
     tx_power_dbm=30.0,
     pathloss_exp=2.2,
     combine_mode="max",          # "max" or "sum"
-    out_dir="outputs"
+    dtype="float64",             # "float32" halves memory on large grids
+    out_dir="outputs",
+    render="sync",               # "sync" | "background" | "none"
+    tile_rows=256,               # grid rows computed per tile (one partial result each)
+    preview=False,               # streaming: render a plot with every partial result
+    tile_size=None,              # square tiles of this side instead of full-width row tiles
+    out_npy=None,                # write the combined map (float32) to this .npy via a memmap
+    coverage=True,               # best server / SINR / coverage KPIs from the same pass
+    rsrp_threshold_dbm=-100.0,   # covered: serving power at least this ...
+    sinr_threshold_db=0.0,       # ... and SINR at least this
+    bandwidth_hz=20e6,           # thermal noise for SINR
+    noise_figure_db=7.0
 ):
     """
     Multi-TX analytical radio map.
     If combine_mode="max": strongest TX dominates (coverage map).
     If "sum": power adds in linear domain.
 
-    Returns JSON with plot path.
+    Streams row tiles (partial payloads, rows not yet computed are NaN), then
+    the final JSON with plot path plus the combined grid under "data".
+    simulate_multi_radio_map() returns just the final one.
+
+    Transmitters are folded tile by tile into a running max / linear sum
+    (core.pathloss.combine_received_power), so the [num_tx, G, G] stack is
+    never built. With tile_size and out_npy, memory stays O(tile) for any
+    number of transmitters and any map size: "power_dbm" is then a read-only
+    memmap of the .npy file (render="none" avoids loading it for the plot).
+
+    With coverage=True the same fold also tracks the serving TX and the total
+    linear power per pixel (core.pathloss.serving_power), giving
+      data["best_server"]: int32 [G, G] serving TX index (-1: not computed yet)
+      data["sinr_db"]:     float32 [G, G] serving / (total - serving + noise)
+    and coverage KPIs (% of the area meeting the RSRP / SINR thresholds, per-TX
+    share of the covered area), accumulated per tile. With out_npy the two
+    arrays go to <out_npy stem>_best_server.npy / _sinr_db.npy.
+
+    The .npy files are written under a temporary name and moved into place
+    (os.replace) when the map is complete, so mappings of a previous run's
+    files (e.g. held by the result cache) keep their data and are never
+    truncated under a reader.
     """
     os.makedirs(out_dir, exist_ok=True)
 
     if tx_positions is None:
         tx_positions = [(0,0,10), (60,0,10), (-60,0,10)]
 
-    w, h = area_size
-    xs = np.linspace(-w/2, w/2, rx_grid_size)
-    ys = np.linspace(-h/2, h/2, rx_grid_size)
-
-    c = 3e8
-    lam = c / frequency_hz
-    fspl_const = 20*np.log10(4*np.pi/lam)
-
-    power_maps = []
-    for (tx_x, tx_y, tx_z) in tx_positions:
-        pmap = np.zeros((rx_grid_size, rx_grid_size))
-        for i, x in enumerate(xs):
-            for j, y in enumerate(ys):
-                d = np.sqrt((x-tx_x)**2 + (y-tx_y)**2 + (tx_z)**2) + 1e-6
-                pl_db = fspl_const + 10*pathloss_exp*np.log10(d)
-                rx_pwr_dbm = tx_power_dbm - pl_db
-                pmap[j, i] = rx_pwr_dbm
-        power_maps.append(pmap)
-
-    power_maps = np.stack(power_maps, axis=0)
-
-    if combine_mode == "sum":
-        # sum in linear mW then back to dBm
-        lin = 10 ** (power_maps/10)
-        combined = 10*np.log10(np.sum(lin, axis=0))
-    else:
-        combined = np.max(power_maps, axis=0)
-
-    fig = plt.figure()
-    plt.imshow(combined, origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]])
-    plt.colorbar(label="Received Power (dBm)")
-    for (tx_x, tx_y, _) in tx_positions:
-        plt.scatter([tx_x], [tx_y], c="red", marker="^")
-    plt.title(f"Multi-TX Radio Map (combine={combine_mode})")
-    plt.xlabel("X (m)")
-    plt.ylabel("Y (m)")
-
-    plot_path = os.path.join(out_dir, "radio_map_multi_tx.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
-
-    return {
-        "plots": [plot_path],
-        "kpis": {
-            "tx_positions": tx_positions,
-            "rx_grid_size": rx_grid_size,
-            "area_size": area_size,
-            "frequency_hz": frequency_hz,
-            "combine_mode": combine_mode
+    xs, ys = grid_axes(rx_grid_size, area_size, dtype)
+    shape = (len(ys), len(xs))
+    band = max(1, int(tile_size or tile_rows or len(ys)))
+    width = max(1, int(tile_size or len(xs)))
+
+    # name -> (dtype, value of rows not computed yet)
+    layout = {"power_dbm": (np.float32 if out_npy else xs.dtype, np.nan)}
+    if coverage:
+        layout["best_server"] = (np.int32, -1)
+        layout["sinr_db"] = (np.float32, np.nan)
+    grids = {}
+    tmp_files = {}                                   # name -> temp .npy, replaced into place at the end
+    for name, (dt, fill) in layout.items():
+        if out_npy:
+            os.makedirs(os.path.dirname(out_npy) or ".", exist_ok=True)
+            tmp_files[name] = f"{_grid_file(out_npy, name)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            grids[name] = np.lib.format.open_memmap(tmp_files[name], mode="w+", dtype=dt, shape=shape)
+            for r0 in range(0, len(ys), band):
+                grids[name][r0:r0 + band] = fill         # rows not computed yet, band by band
+        else:
+            grids[name] = np.empty(shape, dtype=dt)
+    combined = grids["power_dbm"]
+
+    noise_dbm = thermal_noise_dbm(bandwidth_hz, noise_figure_db)
+    noise_mw = 10 ** (noise_dbm/10)
+    counts = {"rsrp": 0, "sinr": 0, "both": 0, "per_tx": np.zeros(len(tx_positions), dtype=np.int64)}
+    path = plot_path(out_dir, "radio_map_multi_tx", [
+        tx_positions, rx_grid_size, area_size, frequency_hz, tx_power_dbm,
+        pathloss_exp, combine_mode, dtype
+    ])
+
+    def payload(rows_done, mode):
+        data = {}
+        for name, (dt, fill) in layout.items():
+            if out_npy:
+                # Pending rows are already filled in the file; partials share the live memmap
+                done = rows_done == len(ys)
+                data[name] = np.load(_grid_file(out_npy, name), mmap_mode="r") if done else grids[name]
+            else:
+                data[name] = grids[name].astype(np.int32 if name == "best_server" else np.float32, copy=rows_done < len(ys))
+                data[name][rows_done:] = fill
+        data["extent"] = [float(xs[0]), float(xs[-1]), float(ys[0]), float(ys[-1])]
+
+        with span("plot"):
+            plots = render_plot(
+                "radio_map", path if rows_done == len(ys) else path.replace(".png", "_partial.png"),
+                data, mode=mode,
+                title=f"Multi-TX Radio Map (combine={combine_mode})", tx_positions=tx_positions
+            )
+
+        return {
+            "plots": plots,
+            "kpis": {
+                "tx_positions": tx_positions,
+                "rx_grid_size": rx_grid_size,
+                "area_size": area_size,
+                "frequency_hz": frequency_hz,
+                "combine_mode": combine_mode,
+                "out_npy": out_npy,
+                **(coverage_kpis(rows_done * len(xs)) if coverage else {})
+            },
+            "data": data
+        }
+
+    def coverage_kpis(n_px):
+        pct = lambda n: 100.0 * n / n_px if n_px else 0.0
+        both = counts["both"]
+        return {
+            "rsrp_threshold_dbm": rsrp_threshold_dbm,
+            "sinr_threshold_db": sinr_threshold_db,
+            "noise_dbm": float(noise_dbm),
+            "coverage_rsrp_pct": pct(counts["rsrp"]),
+            "coverage_sinr_pct": pct(counts["sinr"]),
+            "coverage_pct": pct(both),
+            # Share of the covered area served by each TX
+            "tx_coverage_share_pct": [100.0 * int(n) / both if both else 0.0 for n in counts["per_tx"]],
         }
-    }
+
+    try:
+        for r0 in range(0, len(ys), band):
+            r1 = min(r0 + band, len(ys))
+            for c0 in range(0, len(xs), width):
+                c1 = min(c0 + width, len(xs))
+                tile = (slice(r0, r1), slice(c0, c1))
+                if not coverage:
+                    with span("pathloss"):
+                        combined[tile] = combine_received_power(
+                            tx_positions, xs[c0:c1], ys[r0:r1],
+                            combine_mode=combine_mode,
+                            frequency_hz=frequency_hz,
+                            tx_power_dbm=tx_power_dbm,
+                            pathloss_exp=pathloss_exp,
+                            dtype=dtype
+                        )
+                    continue
+
+                with span("pathloss"):
+                    best, best_tx, total = serving_power(
+                        tx_positions, xs[c0:c1], ys[r0:r1],
+                        frequency_hz=frequency_hz,
+                        tx_power_dbm=tx_power_dbm,
+                        pathloss_exp=pathloss_exp,
+                        dtype=dtype
+                    )
+                with span("coverage"):
+                    combined[tile] = 10*np.log10(total) if combine_mode == "sum" else best
+                    # Interference = everything but the serving TX, floored at the noise
+                    interference = np.maximum(total - 10 ** (best/10), 0) + noise_mw
+                    sinr = best - 10*np.log10(interference)
+                    grids["best_server"][tile] = best_tx
+                    grids["sinr_db"][tile] = sinr
+
+                    ok_rsrp = best >= rsrp_threshold_dbm
+                    ok_sinr = sinr >= sinr_threshold_db
+                    ok = ok_rsrp & ok_sinr
+                    counts["rsrp"] += int(np.count_nonzero(ok_rsrp))
+                    counts["sinr"] += int(np.count_nonzero(ok_sinr))
+                    counts["both"] += int(np.count_nonzero(ok))
+                    counts["per_tx"] += np.bincount(best_tx[ok], minlength=len(tx_positions))
+
+            if r1 < len(ys):
+                yield as_partial(payload(r1, render if preview else "none"), r1, len(ys), "grid row")
+    except BaseException:
+        # Failed or abandoned run: the previous out_npy files stay untouched
+        for tmp in tmp_files.values():
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+
+    if out_npy:
+        for name, grid in grids.items():
+            grid.flush()
+            os.replace(tmp_files[name], _grid_file(out_npy, name))
+    yield payload(len(ys), render)
+
+
+simulate_multi_radio_map = run_to_completion(iter_simulate_multi_radio_map, "simulate_multi_radio_map")
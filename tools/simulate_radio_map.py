@@ -1,67 +1,159 @@
 import os
 import numpy as np
-import matplotlib.pyplot as plt
+from core.tracing import span
+from core.render import plot_path, render as render_plot
+from core.pathloss import grid_axes, received_power_dbm
+from core.streaming import as_partial, run_to_completion
 
-def simulate_radio_map(
+
+def _plot_path(out_dir, tx_pos, rx_grid_size, area_size, frequency_hz, tx_power_dbm, pathloss_exp, dtype):
+    return plot_path(out_dir, "radio_map_single_tx", [
+        tx_pos, rx_grid_size, area_size, frequency_hz, tx_power_dbm, pathloss_exp, dtype
+    ])
+
+
+def _render(path, data, tx_pos, mode):
+    return render_plot(
+        "radio_map", path, data, mode=mode,
+        title="Radio Map (Analytical Pathloss)", tx_positions=[tx_pos], legend=True
+    )
+
+
+def _kpis(tx_pos, rx_grid_size, area_size, frequency_hz):
+    return {
+        "tx_pos": tx_pos,
+        "rx_grid_size": rx_grid_size,
+        "area_size": area_size,
+        "frequency_hz": frequency_hz
+    }
+
+
+def iter_simulate_radio_map(
     tx_pos=(0, 0, 10),
     rx_grid_size=80,
     area_size=(200, 200),      # meters
     frequency_hz=3.5e9,
     tx_power_dbm=30.0,
     pathloss_exp=2.2,
-    out_dir="outputs"
+    dtype="float64",           # "float32" halves memory on large grids
+    out_dir="outputs",
+    render="sync",             # "sync" | "background" | "none"
+    tile_rows=256,             # grid rows computed per tile (one partial result each)
+    preview=False              # streaming: render a plot with every partial result
 ):
     """
     Simple analytical radio map (pathloss-based) if ray tracing not available.
     If you already have Sionna RT pipeline, replace internals.
 
-    Returns:
+    Streams row tiles: yields a partial payload (rows not yet computed are NaN)
+    after each tile, then the final payload. simulate_radio_map() returns
+    just the final one:
       {
         "plots": [<png path>],
-        "kpis": {"tx_pos":..., "frequency_hz":..., "rx_grid_size":...}
+        "kpis": {"tx_pos":..., "frequency_hz":..., "rx_grid_size":...},
+        "data": {"power_dbm": float32 [G, G], "extent": [x0, x1, y0, y1]}
       }
     """
     os.makedirs(out_dir, exist_ok=True)
 
-    tx_x, tx_y, tx_z = tx_pos
-    w, h = area_size
+    xs, ys = grid_axes(rx_grid_size, area_size, dtype)
+    power_map = np.empty((len(ys), len(xs)), dtype=xs.dtype)
+    path = _plot_path(out_dir, tx_pos, rx_grid_size, area_size, frequency_hz, tx_power_dbm, pathloss_exp, dtype)
+
+    def payload(rows_done, mode):
+        grid = power_map.astype(np.float32, copy=rows_done < len(ys))
+        grid[rows_done:] = np.nan
+        data = {
+            "power_dbm": grid,
+            "extent": [float(xs[0]), float(xs[-1]), float(ys[0]), float(ys[-1])],
+        }
 
-    xs = np.linspace(-w/2, w/2, rx_grid_size)
-    ys = np.linspace(-h/2, h/2, rx_grid_size)
+        with span("plot"):
+            plots = _render(path if rows_done == len(ys) else path.replace(".png", "_partial.png"), data, tx_pos, mode)
 
-    power_map = np.zeros((rx_grid_size, rx_grid_size))
+        return {
+            "plots": plots,
+            "kpis": _kpis(tx_pos, rx_grid_size, area_size, frequency_hz),
+            "data": data
+        }
 
-    # Free-space + pathloss exponent approximation
-    c = 3e8
-    lam = c / frequency_hz
-    fspl_const = 20*np.log10(4*np.pi/lam)
+    # Free-space + pathloss exponent approximation (vectorized per row tile)
+    step = max(1, int(tile_rows or len(ys)))
+    for r0 in range(0, len(ys), step):
+        r1 = min(r0 + step, len(ys))
+        with span("pathloss"):
+            power_map[r0:r1] = received_power_dbm(
+                [tx_pos], xs, ys[r0:r1],
+                frequency_hz=frequency_hz,
+                tx_power_dbm=tx_power_dbm,
+                pathloss_exp=pathloss_exp,
+                dtype=dtype
+            )[0]
+        if r1 < len(ys):
+            yield as_partial(payload(r1, render if preview else "none"), r1, len(ys), "grid row")
 
-    for i, x in enumerate(xs):
-        for j, y in enumerate(ys):
-            d = np.sqrt((x-tx_x)**2 + (y-tx_y)**2 + (tx_z)**2) + 1e-6
-            pl_db = fspl_const + 10*pathloss_exp*np.log10(d)
-            rx_pwr_dbm = tx_power_dbm - pl_db
-            power_map[j, i] = rx_pwr_dbm
+    yield payload(len(ys), render)
 
-    fig = plt.figure()
-    plt.imshow(power_map, origin="lower", extent=[xs[0], xs[-1], ys[0], ys[-1]])
-    plt.colorbar(label="Received Power (dBm)")
-    plt.scatter([tx_x], [tx_y], c="red", marker="^", label="TX")
-    plt.title("Radio Map (Analytical Pathloss)")
-    plt.xlabel("X (m)")
-    plt.ylabel("Y (m)")
-    plt.legend()
 
-    plot_path = os.path.join(out_dir, "radio_map_single_tx.png")
-    plt.savefig(plot_path, bbox_inches="tight")
-    plt.close(fig)
+simulate_radio_map = run_to_completion(iter_simulate_radio_map, "simulate_radio_map")
+
+
+def simulate_radio_maps(
+    tx_positions=None,          # one single-TX map per (x, y, z)
+    rx_grid_size=80,
+    area_size=(200, 200),
+    frequency_hz=3.5e9,
+    tx_power_dbm=30.0,
+    pathloss_exp=2.2,
+    dtype="float64",
+    out_dir="outputs",
+    render="sync",
+    tile_rows=256
+):
+    """
+    Several single-TX radio maps over the same grid, computed as one stacked
+    [N, G, G] pass (batched execution of simulate_radio_map). Plots use the
+    paths simulate_radio_map would for each TX:
+      {
+        "plots": [<png path per TX>],      # empty with render="none"
+        "kpis": {"tx_positions":..., "frequency_hz":..., "rx_grid_size":...},
+        "data": {"power_dbm": float32 [N, G, G], "extent": [x0, x1, y0, y1]}
+      }
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if tx_positions is None:
+        tx_positions = [(0, 0, 10)]
+
+    xs, ys = grid_axes(rx_grid_size, area_size, dtype)
+    stack = np.empty((len(tx_positions), len(ys), len(xs)), dtype=np.float32)
+
+    step = max(1, int(tile_rows or len(ys)))
+    for r0 in range(0, len(ys), step):
+        r1 = min(r0 + step, len(ys))
+        with span("pathloss"):
+            stack[:, r0:r1] = received_power_dbm(
+                tx_positions, xs, ys[r0:r1],
+                frequency_hz=frequency_hz,
+                tx_power_dbm=tx_power_dbm,
+                pathloss_exp=pathloss_exp,
+                dtype=dtype
+            )
+
+    extent = [float(xs[0]), float(xs[-1]), float(ys[0]), float(ys[-1])]
+    plots = []
+    with span("plot"):
+        for tx_pos, grid in zip(tx_positions, stack):
+            path = _plot_path(out_dir, tx_pos, rx_grid_size, area_size, frequency_hz, tx_power_dbm, pathloss_exp, dtype)
+            plots += _render(path, {"power_dbm": grid, "extent": extent}, tx_pos, render)
 
     return {
-        "plots": [plot_path],
+        "plots": plots,
         "kpis": {
-            "tx_pos": tx_pos,
+            "tx_positions": tx_positions,
             "rx_grid_size": rx_grid_size,
             "area_size": area_size,
             "frequency_hz": frequency_hz
-        }
+        },
+        "data": {"power_dbm": stack, "extent": extent}
     }
+
@@ -1,15 +1,30 @@
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+import asyncio
 import gradio as gr
 from main import TelecomMultiAgentAssistant
+from core.serving import AssistantServer, ServerBusy
+from core.render import wait_for
 
-assistant = TelecomMultiAgentAssistant()
+# Plots render on a background pool; the handler waits for each one before showing it
+assistant = TelecomMultiAgentAssistant(render="background")
 
-def run_agent(prompt):
-    summary, payload = assistant.chat(prompt)
-    plots = payload.get("plots", [])
-    return summary, plots
+# Cheap radio maps / constellations and heavy BER sweeps get separate worker lanes
+server = AssistantServer(assistant, concurrency={"light": 4, "heavy": 2}, max_queue=32)
+
+async def run_agent(prompt, request: gr.Request):
+    # Streams: the summary/plot update after every SNR point, MIMO point or map tile
+    session_id = request.session_hash if request is not None else "default"
+    try:
+        async for summary, payload in server.submit_stream(session_id, prompt):
+            plots = await asyncio.to_thread(wait_for, payload.get("plots", []))
+            yield summary, plots
+    except ServerBusy as e:
+        yield f"Server busy, please retry: {e}", []
+
+def show_metrics():
+    return server.metrics()
 
 with gr.Blocks() as demo:
     gr.Markdown("# Multi-Agent Telecom Simulation Assistant (Sionna + MCP)")
@@ -18,6 +33,13 @@ with gr.Blocks() as demo:
     out_gallery = gr.Gallery(label="Plots", columns=2)
     btn = gr.Button("Run")
 
-    btn.click(run_agent, inp, [out_summary, out_gallery])
+    with gr.Accordion("Server metrics", open=False):
+        out_metrics = gr.JSON()
+        btn_metrics = gr.Button("Refresh")
+
+    # concurrency_limit=None: admission is bounded by the server's lane queues instead
+    btn.click(run_agent, inp, [out_summary, out_gallery], concurrency_limit=None)
+    btn_metrics.click(show_metrics, None, out_metrics)
 
+demo.queue(default_concurrency_limit=None)
 demo.launch()